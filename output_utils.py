@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试脚本共用的输出目录辅助函数
+"""
+
+import os
+
+def list_output_files(output_dir):
+    """一次scandir同时收集输出目录中的PNG和CSV文件名"""
+    png_files, csv_files = [], []
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if entry.name.endswith('.png'):
+                png_files.append(entry.name)
+            elif entry.name.endswith('.csv'):
+                csv_files.append(entry.name)
+    return png_files, csv_files
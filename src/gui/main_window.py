@@ -815,8 +815,8 @@ class MainWindow(QMainWindow):
             spacing = image_info.get('spacing', (0, 0, 0))
             dicom_count = image_info.get('file_count', 0)  # DICOM图像文件数
             file_count = image_info.get('actual_file_count', 0)  # 目录中的实际文件总数
-            has_rtss = data_dict.get('rtss') is not None
-            rtss_info = f", RTSS: {self.rigid_mover._count_rtss_contours(data_dict.get('rtss'))}个轮廓" if has_rtss else ""
+            has_rtss = data_dict.get('has_rtss', False)
+            rtss_info = f", RTSS: {data_dict.get('rtss_contour_count', 0)}个轮廓" if has_rtss else ""
             
             # 显示更详细的信息
             info_text = (f"模态: {modality}, 尺寸: {size}, "
@@ -12,7 +12,7 @@ import SimpleITK as sitk
 import pydicom
 from typing import Tuple, List, Dict, Optional, Union
 from PyQt5.QtCore import QObject, pyqtSignal
-from scipy.stats import pearsonr, spearmanr
+from scipy.stats import pearsonr, rankdata, t as t_dist
 
 # 导入rt-utils库
 from rt_utils import RTStructBuilder
@@ -71,6 +71,33 @@ def safe_format_r_squared(r_value):
     """安全格式化R平方值，避免字体问题"""
     return f"R-squared={r_value**2:.3f}"
 
+def spearman_correlation(values1, values2):
+    """计算Spearman相关系数及双侧p值
+
+    先用rankdata求秩，再对中心化后的秩向量做点积得到Pearson系数，
+    省去spearmanr内部的2x2相关矩阵与输入检查；p值沿用spearmanr的
+    t分布公式，结果与spearmanr一致。
+    """
+    # rankdata对float32输入返回float32秩，统一转为float64保证精度
+    rank1 = rankdata(values1).astype(np.float64, copy=False)
+    rank2 = rankdata(values2).astype(np.float64, copy=False)
+    rank1 -= rank1.mean()
+    rank2 -= rank2.mean()
+
+    denom = np.sqrt(np.dot(rank1, rank1) * np.dot(rank2, rank2))
+    if denom == 0:
+        # 输入为常量时相关系数无定义，与spearmanr保持一致返回nan
+        return float("nan"), float("nan")
+
+    r = np.clip(np.dot(rank1, rank2) / denom, -1.0, 1.0)
+    dof = rank1.size - 2
+    if dof <= 0:
+        return float(r), float("nan")
+    with np.errstate(divide="ignore"):
+        t_stat = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+    p = 2 * t_dist.sf(np.abs(t_stat), dof)
+    return float(r), float(p)
+
 # 初始化字体配置
 configure_matplotlib_fonts()
 
@@ -122,12 +149,14 @@ class CorrelationAnalyzer(QObject):
             "image": None,  # 第一个NIfTI图像
             "file_path": None,  # 文件路径
             "loaded": False,  # 是否已加载
+            "derived": {},  # 由图像派生的缓存(数值范围/掩码)，图像更换时清空
         }
 
         self.nifti2_data = {
             "image": None,  # 第二个NIfTI图像
             "file_path": None,  # 文件路径
             "loaded": False,  # 是否已加载
+            "derived": {},  # 由图像派生的缓存(数值范围/掩码)，图像更换时清空
         }
 
         # 分析结果
@@ -805,7 +834,7 @@ class CorrelationAnalyzer(QObject):
                     self.results["pearson_p"] = pearson_p
 
                     # Spearman相关系数
-                    spearman_r, spearman_p = spearmanr(pet1_values, pet2_values)
+                    spearman_r, spearman_p = spearman_correlation(pet1_values, pet2_values)
                     self.results["spearman_r"] = spearman_r
                     self.results["spearman_p"] = spearman_p
 
@@ -1188,7 +1217,7 @@ class CorrelationAnalyzer(QObject):
                 self.logger.warning("散点图创建时发现相关系数无效，重新计算...")
                 try:
                     pearson_r, pearson_p = pearsonr(pet1_values, pet2_values)
-                    spearman_r, spearman_p = spearmanr(pet1_values, pet2_values)
+                    spearman_r, spearman_p = spearman_correlation(pet1_values, pet2_values)
                 except Exception as e:
                     self.logger.error(f"重新计算相关系数时出错: {e}")
                     pearson_r = pearson_p = spearman_r = spearman_p = float("nan")
@@ -1264,7 +1293,7 @@ class CorrelationAnalyzer(QObject):
             raise
 
     def load_nifti_file(
-        self, file_path: str, is_first: bool = True
+        self, file_path: str, is_first: bool = True, image: sitk.Image = None
     ) -> Tuple[bool, str]:
         """
         加载NIfTI文件
@@ -1272,6 +1301,7 @@ class CorrelationAnalyzer(QObject):
         Args:
             file_path: NIfTI文件路径
             is_first: 是否为第一个文件
+            image: 已从file_path读取的图像，提供时直接使用，不再重复读取
 
         Returns:
             Tuple[bool, str]: (成功标志, 消息)
@@ -1288,11 +1318,13 @@ class CorrelationAnalyzer(QObject):
             target_data["image"] = None
             target_data["file_path"] = None
             target_data["loaded"] = False
+            target_data["derived"] = {}
 
             self.progress_updated.emit(10, f"加载NIfTI文件...")
 
             # 使用SimpleITK加载图像
-            image = sitk.ReadImage(file_path)
+            if image is None:
+                image = sitk.ReadImage(file_path)
 
             # 保存数据
             target_data["image"] = image
@@ -1358,13 +1390,21 @@ class CorrelationAnalyzer(QObject):
 
                 # 更新存储的图像
                 self.nifti2_data["image"] = image2
+                self.nifti2_data["derived"] = {}
 
-            # 转换为numpy数组
-            array1 = sitk.GetArrayFromImage(image1)
-            array2 = sitk.GetArrayFromImage(image2)
+            # 只读访问，直接使用零拷贝视图
+            array1 = sitk.GetArrayViewFromImage(image1)
+            array2 = sitk.GetArrayViewFromImage(image2)
 
-            self.logger.info(f"图像1数值范围: [{np.min(array1)}, {np.max(array1)}]")
-            self.logger.info(f"图像2数值范围: [{np.min(array2)}, {np.max(array2)}]")
+            # 同一对图像上多次分析(如遍历掩码选项)时，数值范围只计算一次
+            range1 = self._nifti_derived(
+                self.nifti1_data, "range", lambda: (np.min(array1), np.max(array1))
+            )
+            range2 = self._nifti_derived(
+                self.nifti2_data, "range", lambda: (np.min(array2), np.max(array2))
+            )
+            self.logger.info(f"图像1数值范围: [{range1[0]}, {range1[1]}]")
+            self.logger.info(f"图像2数值范围: [{range2[0]}, {range2[1]}]")
 
             # 生成掩码
             self.progress_updated.emit(
@@ -1372,26 +1412,26 @@ class CorrelationAnalyzer(QObject):
             )
             mask = self._generate_nifti_mask(array1, array2, mask_option, threshold)
 
-            if np.sum(mask) == 0:
+            # 掩码只扫描一次得到平坦索引，两幅图像按同一索引取值
+            mask_indices = np.flatnonzero(mask)
+            del mask
+            mask_count = mask_indices.size
+            if mask_count == 0:
                 return False, f"掩码为空，无法分析相关性"
 
-            mask_count = np.sum(mask)
             self.logger.info(f"掩码包含 {mask_count} 个像素")
 
             # 提取像素值
             self.progress_updated.emit(40, "提取像素值...")
-            values1 = array1[mask]
-            values2 = array2[mask]
-
-            # 移除无效值
-            valid_mask = ~(
-                np.isnan(values1)
-                | np.isinf(values1)
-                | np.isnan(values2)
-                | np.isinf(values2)
-            )
-            values1 = values1[valid_mask]
-            values2 = values2[valid_mask]
+            values1 = array1.ravel().take(mask_indices)
+            values2 = array2.ravel().take(mask_indices)
+
+            # 移除无效值 (NaN/Inf)
+            valid_mask = np.isfinite(values1)
+            valid_mask &= np.isfinite(values2)
+            if not valid_mask.all():
+                values1 = values1[valid_mask]
+                values2 = values2[valid_mask]
 
             if len(values1) < 5:
                 return False, f"有效像素数量太少 ({len(values1)})，无法计算可靠的相关性"
@@ -1399,7 +1439,7 @@ class CorrelationAnalyzer(QObject):
             # 计算相关系数
             self.progress_updated.emit(60, "计算相关系数...")
             pearson_r, pearson_p = pearsonr(values1, values2)
-            spearman_r, spearman_p = spearmanr(values1, values2)
+            spearman_r, spearman_p = spearman_correlation(values1, values2)
 
             # 保存结果
             self.results = {
@@ -1468,6 +1508,23 @@ class CorrelationAnalyzer(QObject):
             self.logger.error(msg, exc_info=True)
             return False, msg
 
+    def _nifti_derived(self, nifti_data: Dict, key, compute):
+        """
+        取出NIfTI图像的派生结果，不存在时计算并缓存
+
+        Args:
+            nifti_data: self.nifti1_data 或 self.nifti2_data
+            key: 缓存键
+            compute: 无参函数，返回要缓存的结果
+
+        Returns:
+            缓存的结果
+        """
+        derived = nifti_data.setdefault("derived", {})
+        if key not in derived:
+            derived[key] = compute()
+        return derived[key]
+
     def _generate_nifti_mask(
         self,
         array1: np.ndarray,
@@ -1487,22 +1544,32 @@ class CorrelationAnalyzer(QObject):
         Returns:
             np.ndarray: 布尔掩码
         """
+        # 各基础比较结果按图像缓存，遍历多个掩码选项时每个只计算一次；
+        # 缓存的数组只读，组合时生成新数组
+        data1, data2 = self.nifti1_data, self.nifti2_data
         if mask_option == "non_zero_first":
             # 第一个图像的所有非零像素
-            mask = array1 != 0
+            mask = self._nifti_derived(data1, "non_zero", lambda: array1 != 0)
         elif mask_option == "non_zero_both":
             # 两个图像都非零的像素
-            mask = (array1 != 0) & (array2 != 0)
+            mask = np.logical_and(
+                self._nifti_derived(data1, "non_zero", lambda: array1 != 0),
+                self._nifti_derived(data2, "non_zero", lambda: array2 != 0),
+            )
         elif mask_option == "positive_first":
             # 第一个图像的所有正值像素
-            mask = array1 > 0
+            mask = self._nifti_derived(data1, "positive", lambda: array1 > 0)
         elif mask_option == "threshold_first":
             # 第一个图像超过阈值的像素
-            mask = array1 > threshold
+            mask = self._nifti_derived(
+                data1, ("threshold", threshold), lambda: array1 > threshold
+            )
         else:
             raise ValueError(f"未知的掩码选项: {mask_option}")
 
-        self.logger.info(f"掩码选项: {mask_option}, 掩码像素数: {np.sum(mask)}")
+        self.logger.info(
+            f"掩码选项: {mask_option}, 掩码像素数: {np.count_nonzero(mask)}"
+        )
         return mask
 
     def _save_nifti_csv(
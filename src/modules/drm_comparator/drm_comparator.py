@@ -4,6 +4,15 @@ import numpy as np
 import os
 from typing import Optional, Tuple
 
+try:
+    import torch
+    import torch.nn.functional as F
+except ImportError:  # 可选依赖: 未安装时只使用SimpleITK重采样
+    torch = None
+
+# 所有重采样统一使用线性插值: 8邻域采样, 远比B样条/高阶插值便宜,
+# 对剂量类的平滑图像精度损失可以忽略
+RESAMPLE_INTERPOLATOR = sitk.sitkLinear
 
 class DrmComparator:
     """
@@ -19,6 +28,14 @@ class DrmComparator:
         self.final_transformed_image: Optional[sitk.Image] = None
         self.reference_image_for_dvf: Optional[sitk.Image] = None
         self.target_space_image: Optional[sitk.Image] = None
+        # Target image read by the last target-space resample, kept for reuse
+        self.target_reference_image: Optional[sitk.Image] = None
+        # Per-axis max |displacement| of the DVF (mm), used to bound the ROI crop
+        self.dvf_max_displacement: Optional[np.ndarray] = None
+        # Store the DVF at half resolution per axis (smooth fields, ~8x fewer bytes)
+        self.low_res_dvf: bool = False
+        # Opt in to the torch grid_sample path for the rigid+DVF resample (needs CUDA)
+        self.use_gpu_resample: bool = False
 
     def load_nifti(self, file_path: str) -> bool:
         """Loads a NIfTI file, preserving its original data type."""
@@ -166,25 +183,17 @@ class DrmComparator:
 
             spacing = (x_spacing, y_spacing, z_spacing)
 
-            vectors_float32 = np.frombuffer(grid_item.VectorGridData, dtype=np.float32)
-            vectors_float64 = vectors_float32.astype(np.float64)
+            # Interleaved (x, y, z) vectors; a single float64 conversion builds the
+            # whole vector volume, and the components below are views into it
+            vectors_float32 = np.frombuffer(
+                grid_item.VectorGridData, dtype=np.float32
+            ).reshape(size[2], size[1], size[0], 3)
+            vectors = vectors_float32.transpose(2, 1, 0, 3).astype(np.float64)
 
             # Separate the components
-            dx = (
-                vectors_float64[0::3]
-                .reshape(size[2], size[1], size[0])
-                .transpose(2, 1, 0)
-            )
-            dy = (
-                vectors_float64[1::3]
-                .reshape(size[2], size[1], size[0])
-                .transpose(2, 1, 0)
-            )
-            dz = (
-                vectors_float64[2::3]
-                .reshape(size[2], size[1], size[0])
-                .transpose(2, 1, 0)
-            )
+            dx = vectors[..., 0]
+            dy = vectors[..., 1]
+            dz = vectors[..., 2]
 
             # --- DVF Data Inspection ---
             print("\n" + "-" * 20)
@@ -212,13 +221,14 @@ class DrmComparator:
             print("-" * 20 + "\n")
             # --- End Inspection ---
 
-            # Create a scalar image for each component
-            dx_image = sitk.GetImageFromArray(dx, isVector=False)
-            dy_image = sitk.GetImageFromArray(dy, isVector=False)
-            dz_image = sitk.GetImageFromArray(dz, isVector=False)
+            self.dvf_max_displacement = np.array(
+                [max(-stats[0], stats[1]) for stats in (stats_dx, stats_dy, stats_dz)]
+            )
 
-            # Compose them into a vector image
-            dvf_image = sitk.Compose(dx_image, dy_image, dz_image)
+            # Build the vector image in one step (same as composing the three
+            # component images, without the per-component copies)
+            dvf_image = sitk.GetImageFromArray(vectors, isVector=True)
+            del vectors, dx, dy, dz
             dvf_image.SetOrigin(origin)
             dvf_image.SetSpacing(spacing)
 
@@ -256,20 +266,267 @@ class DrmComparator:
                 + self.reference_image_for_dvf.GetDirection()
             )
 
+            if self.low_res_dvf:
+                self.dvf_transform = self._downsample_dvf(self.dvf_transform)
+
             print(f"Successfully loaded DVF from: {dvf_file_path}")
             return True
         except Exception as e:
             print(f"Error loading DICOM DVF file: {e}")
             self.dvf_transform = None
+            self.dvf_max_displacement = None
             return False
 
-    def apply_transformations_direct_to_target(self, target_image_path: str) -> Tuple[bool, str]:
+    @staticmethod
+    def _downsample_dvf(
+        dvf_transform: sitk.DisplacementFieldTransform, factor: int = 2
+    ) -> sitk.DisplacementFieldTransform:
+        """
+        Returns a DisplacementFieldTransform whose field is linearly resampled
+        onto a grid `factor` times coarser per axis. The first and last grid
+        points keep their physical positions, so between them the field is
+        interpolated back at query points by the transform. ITK's half-voxel
+        border beyond them widens with the spacing, so in that edge band the
+        coarse field still displaces points that the full field leaves alone.
+        """
+        field = dvf_transform.GetDisplacementField()
+        size = np.array(field.GetSize())
+        low_size = np.maximum((size - 1) // factor + 1, 1)
+        spacing = np.array(field.GetSpacing(), dtype=float)
+        low_spacing = np.where(
+            low_size > 1, spacing * (size - 1) / np.maximum(low_size - 1, 1), spacing
+        )
+
+        low_field = sitk.Resample(
+            field,
+            [int(v) for v in low_size],
+            sitk.Transform(3, sitk.sitkIdentity),
+            sitk.sitkLinear,
+            field.GetOrigin(),
+            low_spacing.tolist(),
+            field.GetDirection(),
+            0.0,
+            field.GetPixelID(),
+        )
+        print(f"Downsampled DVF grid from {size.tolist()} to {low_size.tolist()}")
+        return sitk.DisplacementFieldTransform(low_field)
+
+    def _crop_moving_to_reference(self, reference_image: sitk.Image) -> sitk.Image:
+        """
+        Crops the moving NIfTI image to the region that the rigid+DVF composite
+        can actually sample when resampling onto reference_image's grid.
+
+        A composite point is rigid(x + u(x)), so x + u(x) stays inside the
+        reference bounding box grown by the max displacement per axis; the
+        rigid transform is affine, so mapping that box's 8 corners bounds the
+        sampled region exactly. The crop keeps physical placement, so the
+        resampled output is unchanged. self.nifti_image itself is not modified.
+        """
+        moving = self.nifti_image
+        if self.dvf_max_displacement is None:
+            field = self.dvf_transform.GetDisplacementField()
+            self.dvf_max_displacement = np.abs(
+                sitk.GetArrayViewFromImage(field).reshape(-1, 3)
+            ).max(axis=0)
+
+        ref_last_index = np.array(reference_image.GetSize()) - 1
+        ref_corners = np.array(
+            [
+                reference_image.TransformContinuousIndexToPhysicalPoint(
+                    [float(v) for v in np.array(corner) * ref_last_index]
+                )
+                for corner in np.ndindex(2, 2, 2)
+            ]
+        )
+        box_min = ref_corners.min(axis=0) - self.dvf_max_displacement
+        box_max = ref_corners.max(axis=0) + self.dvf_max_displacement
+
+        moving_indices = np.array(
+            [
+                moving.TransformPhysicalPointToContinuousIndex(
+                    self.rigid_transform.TransformPoint(
+                        [float(v) for v in np.where(corner, box_max, box_min)]
+                    )
+                )
+                for corner in np.ndindex(2, 2, 2)
+            ]
+        )
+
+        # Linear interpolation reads one neighbour beyond the point; keep a 2-voxel margin
+        margin = 2
+        moving_size = np.array(moving.GetSize())
+        lower = np.maximum(np.floor(moving_indices.min(axis=0)).astype(int) - margin, 0)
+        upper = np.minimum(
+            np.ceil(moving_indices.max(axis=0)).astype(int) + margin + 1, moving_size
+        )
+        crop_size = upper - lower
+        if np.any(crop_size <= 0) or np.array_equal(crop_size, moving_size):
+            return moving
+
+        print(
+            f"Cropping moving image to ROI: index={lower.tolist()}, size={crop_size.tolist()} "
+            f"(from {moving_size.tolist()})"
+        )
+        return sitk.RegionOfInterest(
+            moving, [int(v) for v in crop_size], [int(v) for v in lower]
+        )
+
+    @staticmethod
+    def _index_to_physical(image: sitk.Image) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (A, origin) such that physical = origin + A @ continuous_index."""
+        direction = np.array(image.GetDirection(), dtype=float).reshape(3, 3)
+        return direction * np.array(image.GetSpacing(), dtype=float), np.array(
+            image.GetOrigin(), dtype=float
+        )
+
+    def _bake_rigid_into_dvf(self) -> sitk.DisplacementFieldTransform:
+        """
+        Folds the rigid transform into the DVF so that a single displacement
+        field reproduces the rigid+DVF composite on the DVF grid:
+            u'(x) = R (x + u(x) - c) + t + c - x
+                  = R u(x) + (R - I) x + (t + c - R c)
+        (R - I) x is affine in the voxel index, so it is added per axis by
+        broadcasting instead of materialising a physical-coordinate volume.
+        Off the DVF grid the baked field is no longer equivalent (it falls back
+        to identity instead of rigid), so only use it for outputs on that grid.
+        """
+        field = self.dvf_transform.GetDisplacementField()
+        R = np.array(self.rigid_transform.GetMatrix(), dtype=float).reshape(3, 3)
+        t = np.array(self.rigid_transform.GetTranslation(), dtype=float)
+        c = np.array(self.rigid_transform.GetCenter(), dtype=float)
+        A, origin = self._index_to_physical(field)
+        M = (R - np.identity(3)) @ A
+
+        # array is (Z, Y, X, 3); index axis i of M pairs with array axis 2 - i
+        baked = sitk.GetArrayViewFromImage(field) @ R.T
+        baked += (R - np.identity(3)) @ origin + t + c - R @ c
+        size_x, size_y, size_z = field.GetSize()
+        baked += np.arange(size_z, dtype=float)[:, None, None, None] * M[:, 2]
+        baked += np.arange(size_y, dtype=float)[None, :, None, None] * M[:, 1]
+        baked += np.arange(size_x, dtype=float)[None, None, :, None] * M[:, 0]
+
+        baked_image = sitk.GetImageFromArray(baked, isVector=True)
+        baked_image.CopyInformation(field)
+        return sitk.DisplacementFieldTransform(baked_image)
+
+    def _use_gpu_resample(self, resampler: sitk.ResampleImageFilter) -> bool:
+        """
+        The torch path is only used when explicitly enabled, PyTorch and CUDA are
+        usable, and the resampler interpolates linearly (the only mode it implements).
+        """
+        return (
+            self.use_gpu_resample
+            and torch is not None
+            and torch.cuda.is_available()
+            and resampler.GetInterpolator() == sitk.sitkLinear
+        )
+
+    @staticmethod
+    def _torch_sample_linear(volume, image: sitk.Image, points, default_value: float = 0.0):
+        """
+        Linearly samples volume (1, C, Z, Y, X) defined on image's grid at the
+        physical points (Z', Y', X', 3). Points outside the buffer (ITK's
+        [-0.5, size - 0.5) rule) give default_value, as SimpleITK does.
+        """
+        A, origin = DrmComparator._index_to_physical(image)
+        A_inv = torch.as_tensor(np.linalg.inv(A), dtype=points.dtype, device=points.device)
+        origin = torch.as_tensor(origin, dtype=points.dtype, device=points.device)
+        size = torch.as_tensor(image.GetSize(), dtype=points.dtype, device=points.device)
+
+        cidx = (points - origin) @ A_inv.T
+        # align_corners=True maps -1/+1 onto the first/last voxel centres
+        grid = 2.0 * cidx / torch.clamp(size - 1, min=1) - 1.0
+        sampled = F.grid_sample(
+            volume, grid.unsqueeze(0), mode="bilinear",
+            padding_mode="border", align_corners=True,
+        )[0]
+        inside = ((cidx >= -0.5) & (cidx < size - 0.5)).all(dim=-1)
+        return torch.where(inside, sampled, torch.full_like(sampled, default_value))
+
+    def _resample_composite_torch(
+        self, moving: sitk.Image, reference_image: sitk.Image,
+        default_value: float = 0.0, output_pixel_type: int = sitk.sitkUnknown,
+    ) -> sitk.Image:
+        """
+        Torch equivalent of a linear resample of moving through the rigid+DVF
+        composite onto reference_image's grid: each output voxel p samples moving
+        at rigid(p + u(p)), with u linearly interpolated from the DVF.
+        Computation is float32 (on the GPU when CUDA is available); the result
+        is cast to output_pixel_type, or keeps moving's pixel type when unknown.
+        """
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        dtype = torch.float32
+
+        size_x, size_y, size_z = reference_image.GetSize()
+        zz, yy, xx = torch.meshgrid(
+            torch.arange(size_z, device=device, dtype=dtype),
+            torch.arange(size_y, device=device, dtype=dtype),
+            torch.arange(size_x, device=device, dtype=dtype),
+            indexing="ij",
+        )
+        A_ref, origin_ref = self._index_to_physical(reference_image)
+        points = torch.stack((xx, yy, zz), dim=-1) @ torch.as_tensor(
+            A_ref.T, dtype=dtype, device=device
+        ) + torch.as_tensor(origin_ref, dtype=dtype, device=device)
+        del xx, yy, zz
+
+        # DVF first: q = p + u(p)
+        field = self.dvf_transform.GetDisplacementField()
+        field_tensor = torch.as_tensor(
+            sitk.GetArrayViewFromImage(field), dtype=dtype, device=device
+        ).permute(3, 0, 1, 2).unsqueeze(0)
+        points += self._torch_sample_linear(field_tensor, field, points).permute(1, 2, 3, 0)
+        del field_tensor
+
+        # then rigid: y = R (q - c) + t + c
+        R = torch.as_tensor(
+            np.array(self.rigid_transform.GetMatrix()).reshape(3, 3), dtype=dtype, device=device
+        )
+        center = torch.as_tensor(self.rigid_transform.GetCenter(), dtype=dtype, device=device)
+        translation = torch.as_tensor(
+            self.rigid_transform.GetTranslation(), dtype=dtype, device=device
+        )
+        points = (points - center) @ R.T + translation + center
+
+        moving_array = sitk.GetArrayViewFromImage(moving)
+        moving_tensor = torch.as_tensor(moving_array, dtype=dtype, device=device)[None, None]
+        values = self._torch_sample_linear(moving_tensor, moving, points, default_value)[0]
+
+        result = sitk.GetImageFromArray(values.cpu().numpy())
+        result.CopyInformation(reference_image)
+        if output_pixel_type == sitk.sitkUnknown:
+            output_pixel_type = moving.GetPixelID()
+        if result.GetPixelID() != output_pixel_type:
+            result = sitk.Cast(result, output_pixel_type)
+        return result
+
+    def _resample_composite(
+        self, resampler: sitk.ResampleImageFilter, moving: sitk.Image,
+        reference_image: sitk.Image,
+    ) -> sitk.Image:
+        """Runs the rigid+DVF resample on the GPU when opted in and supported, else through SimpleITK."""
+        if self._use_gpu_resample(resampler):
+            try:
+                result = self._resample_composite_torch(
+                    moving, reference_image,
+                    resampler.GetDefaultPixelValue(), resampler.GetOutputPixelType(),
+                )
+                print("Resampled composite transform on GPU (torch grid_sample)")
+                return result
+            except Exception as e:
+                print(f"Warning: GPU resampling failed, falling back to SimpleITK: {e}")
+        return resampler.Execute(moving)
+
+    def apply_transformations_direct_to_target(
+        self, target_image_path: str, with_rigid_only: bool = False
+    ) -> Tuple[bool, str]:
         """
         直接将变换应用到目标空间，避免中间重采样步骤，减少累积误差。
         这是推荐的方法，因为它只进行一次插值操作。
 
         Args:
             target_image_path: 目标图像路径，用于定义输出空间
+            with_rigid_only: 是否额外生成仅刚体变换的对比结果（调试用，会多一次整卷重采样）
 
         Returns:
             Tuple[bool, str]: (成功标志, 消息)
@@ -284,6 +541,7 @@ class DrmComparator:
         try:
             # 加载目标图像定义输出空间
             target_img = sitk.ReadImage(target_image_path)
+            self.target_reference_image = target_img
             print(f"Loaded target space image from: {target_image_path}")
 
             print("--- Target Space Information ---")
@@ -301,13 +559,18 @@ class DrmComparator:
             # 直接重采样到目标空间（一步到位，减少误差）
             resampler = sitk.ResampleImageFilter()
             resampler.SetReferenceImage(target_img)  # 使用目标图像定义输出空间
-            resampler.SetInterpolator(sitk.sitkLinear)
+            resampler.SetInterpolator(RESAMPLE_INTERPOLATOR)
             resampler.SetTransform(composite_transform)
             resampler.SetOutputPixelType(self.nifti_image.GetPixelID())
             resampler.SetDefaultPixelValue(0.0)
 
+            # 只把会被采样到的区域送入重采样，缩小输入工作集
+            moving_roi = self._crop_moving_to_reference(target_img)
+
             # 执行变换（一次插值完成所有变换）
-            self.target_space_image = resampler.Execute(self.nifti_image)
+            self.target_space_image = self._resample_composite(
+                resampler, moving_roi, target_img
+            )
 
             print("--- Final Result Information ---")
             print(f"Result size: {self.target_space_image.GetSize()}")
@@ -317,15 +580,13 @@ class DrmComparator:
 
             print("✓ Successfully applied transformations directly to target space (single interpolation)")
 
-            # 同时生成仅刚体变换的结果用于对比
-            resampler_rigid = sitk.ResampleImageFilter()
-            resampler_rigid.SetReferenceImage(target_img)  # 也使用目标空间
-            resampler_rigid.SetInterpolator(sitk.sitkLinear)
-            resampler_rigid.SetTransform(self.rigid_transform)
-            resampler_rigid.SetOutputPixelType(self.nifti_image.GetPixelID())
-            resampler_rigid.SetDefaultPixelValue(0.0)
-            self.rigid_transformed_image = resampler_rigid.Execute(self.nifti_image)
-            print("✓ Also generated rigid-only transformation in target space for comparison")
+            # 仅刚体变换的对比结果按需生成，默认不在主路径上多做一次重采样
+            if with_rigid_only:
+                resampler.SetTransform(self.rigid_transform)
+                self.rigid_transformed_image = resampler.Execute(moving_roi)
+                print("✓ Also generated rigid-only transformation in target space for comparison")
+            else:
+                self.rigid_transformed_image = None
 
             return True, "Transformations applied directly to target space successfully (optimized single-step method)"
 
@@ -334,7 +595,12 @@ class DrmComparator:
             traceback.print_exc()
             return False, f"An error occurred during direct transformation to target space: {e}"
 
-    def apply_transformations(self, target_image_path: str = None, direct_to_target: bool = True) -> Tuple[bool, str]:
+    def apply_transformations(
+        self,
+        target_image_path: str = None,
+        direct_to_target: bool = True,
+        with_rigid_only: bool = False,
+    ) -> Tuple[bool, str]:
         """
         应用变换，支持两种模式：
         1. 直接到目标空间（推荐）：减少插值误差，提高精度
@@ -343,13 +609,16 @@ class DrmComparator:
         Args:
             target_image_path: 目标图像路径（direct_to_target=True时必需）
             direct_to_target: 是否直接重采样到目标空间（推荐True）
+            with_rigid_only: 直接模式下是否额外生成仅刚体变换的对比结果
 
         Returns:
             Tuple[bool, str]: (成功标志, 消息)
         """
         if direct_to_target and target_image_path:
             print("🚀 Using optimized direct-to-target transformation method")
-            return self.apply_transformations_direct_to_target(target_image_path)
+            return self.apply_transformations_direct_to_target(
+                target_image_path, with_rigid_only=with_rigid_only
+            )
         else:
             print("⚠️  Using traditional two-step transformation method")
             return self._apply_transformations_traditional()
@@ -374,26 +643,35 @@ class DrmComparator:
             # Resample the nifti image using the composite transform
             # Use DVF reference image to define the output space (final target space)
             resampler = sitk.ResampleImageFilter()
+            sampling_transform = composite_transform
             if self.reference_image_for_dvf is not None:
-                resampler.SetReferenceImage(self.reference_image_for_dvf)
+                output_grid = self.reference_image_for_dvf
                 print("Using DVF reference image for final transformation output space")
+                moving_roi = self._crop_moving_to_reference(output_grid)
+                # Output voxels coincide with the DVF grid, so the rigid part can be
+                # folded into the field once instead of evaluated per sample
+                sampling_transform = self._bake_rigid_into_dvf()
             else:
-                resampler.SetReferenceImage(self.nifti_image)
+                output_grid = self.nifti_image
                 print(
                     "Warning: DVF reference image not available, using original image space"
                 )
-            resampler.SetInterpolator(sitk.sitkLinear)
-            resampler.SetTransform(composite_transform)
+                moving_roi = self.nifti_image
+            resampler.SetReferenceImage(output_grid)
+            resampler.SetInterpolator(RESAMPLE_INTERPOLATOR)
+            resampler.SetTransform(sampling_transform)
             resampler.SetOutputPixelType(self.nifti_image.GetPixelID())
             resampler.SetDefaultPixelValue(0.0)
 
-            self.final_transformed_image = resampler.Execute(self.nifti_image)
+            self.final_transformed_image = self._resample_composite(
+                resampler, moving_roi, output_grid
+            )
             print("Successfully applied composite transformation.")
 
             # For debugging, also save the rigid-only transformation
             resampler_rigid = sitk.ResampleImageFilter()
             resampler_rigid.SetReferenceImage(self.nifti_image)
-            resampler_rigid.SetInterpolator(sitk.sitkLinear)
+            resampler_rigid.SetInterpolator(RESAMPLE_INTERPOLATOR)
             resampler_rigid.SetTransform(self.rigid_transform)
             resampler_rigid.SetOutputPixelType(self.nifti_image.GetPixelID())
             resampler_rigid.SetDefaultPixelValue(0.0)
@@ -431,7 +709,7 @@ class DrmComparator:
         try:
             resampler = sitk.ResampleImageFilter()
             resampler.SetReferenceImage(self.nifti_image)
-            resampler.SetInterpolator(sitk.sitkLinear)
+            resampler.SetInterpolator(RESAMPLE_INTERPOLATOR)
             resampler.SetTransform(self.rigid_transform)
             resampler.SetOutputPixelType(self.nifti_image.GetPixelID())
 
@@ -446,13 +724,18 @@ class DrmComparator:
         except Exception as e:
             return False, f"An error occurred during rigid transformation: {e}"
 
-    def resample_to_target_space(self, target_image_path: str) -> Tuple[bool, str]:
+    def resample_to_target_space(
+        self, target_image_path: str, antialias: bool = False
+    ) -> Tuple[bool, str]:
         """
         Resamples the final transformed image to the target space defined by the target image.
         This is the third step in the three-step registration pipeline:
         1. Original -> Rigid transform -> Intermediate space
         2. Intermediate -> DVF transform -> DVF space
         3. DVF space -> Resample -> Target space
+
+        When antialias is True and the target grid is coarser than the DVF grid,
+        the image is Gaussian-smoothed before the linear resample.
         """
         if self.final_transformed_image is None:
             return (
@@ -463,6 +746,7 @@ class DrmComparator:
         try:
             # Load target image to get target space information
             target_img = sitk.ReadImage(target_image_path)
+            self.target_reference_image = target_img
             print(f"Loaded target space image from: {target_image_path}")
 
             print("--- Target Space Information ---")
@@ -477,12 +761,16 @@ class DrmComparator:
             print(f"DVF origin: {self.final_transformed_image.GetOrigin()}")
             print("------------------------------------")
 
+            source_image = self.final_transformed_image
+            if antialias:
+                source_image = self._antialias_for_grid(source_image, target_img)
+
             # Create resampler for target space
             resampler = sitk.ResampleImageFilter()
             resampler.SetReferenceImage(
                 target_img
             )  # Use target image to define output space
-            resampler.SetInterpolator(sitk.sitkLinear)  # Bilinear interpolation
+            resampler.SetInterpolator(RESAMPLE_INTERPOLATOR)
             resampler.SetTransform(
                 sitk.Transform(3, sitk.sitkIdentity)
             )  # Identity transform (no additional deformation)
@@ -490,7 +778,7 @@ class DrmComparator:
             resampler.SetDefaultPixelValue(0.0)
 
             # Execute resampling
-            self.target_space_image = resampler.Execute(self.final_transformed_image)
+            self.target_space_image = resampler.Execute(source_image)
 
             print("--- Final Target Space Result ---")
             print(f"Final size: {self.target_space_image.GetSize()}")
@@ -510,6 +798,24 @@ class DrmComparator:
             traceback.print_exc()
             return False, f"An error occurred during target space resampling: {e}"
 
+    @staticmethod
+    def _antialias_for_grid(image: sitk.Image, target_img: sitk.Image) -> sitk.Image:
+        """
+        Smooths image before a downsampling resample onto target_img's grid.
+        Sigma per axis is half the spacing ratio (in mm); axes that are not
+        downsampled are left untouched.
+        """
+        src_spacing = np.array(image.GetSpacing(), dtype=float)
+        dst_spacing = np.array(target_img.GetSpacing(), dtype=float)
+        ratio = dst_spacing / src_spacing
+        if not np.any(ratio > 1.0):
+            return image
+
+        sigma = np.where(ratio > 1.0, 0.5 * ratio * src_spacing, 0.0)
+        print(f"Anti-aliasing before downsampling, sigma (mm): {sigma.tolist()}")
+        # DiscreteGaussian accepts a zero variance per axis, unlike the recursive filter
+        return sitk.DiscreteGaussian(image, (sigma ** 2).tolist(), 32, 0.01, True)
+
     def compare_resampling_methods(self, target_image_path: str, output_dir: str = "comparison_output") -> Tuple[bool, str]:
         """
         比较直接重采样和传统分步重采样的结果差异
@@ -1,8 +1,23 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+"""
+图像刚体位移模块
+
+性能模型:
+    热点路径(重采样 -> 像素转换 -> 逐层写出DICOM)是内存带宽/磁盘I/O受限,
+    而非计算受限, 因此优化优先减少内存遍历次数和I/O调用次数:
+    - 整卷一次性完成像素类型转换与重标定, 不逐层重复扫描
+    - 像素缓冲保持C连续, 每层PixelData直接取视图, 避免额外拷贝
+    - 逐层序列化在内存中完成, 由线程池并发写盘, 每个文件一次写入
+    - 可选Deflate传输语法, 以CPU换取更小的写盘量
+    - 诊断日志按级别惰性生成, 避免在循环中重复输出
+"""
 
 import os
+import copy
 import glob
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import SimpleITK as sitk
 import numpy as np
@@ -10,6 +25,8 @@ from typing import Tuple, List, Dict, Optional, Union
 from PyQt5.QtCore import QObject, pyqtSignal
 import pydicom
 from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.filebase import DicomBytesIO
+from pydicom.filewriter import write_dataset, write_file_meta_info
 from datetime import datetime
 
 # 忽略pydicom的弃用警告
@@ -76,7 +93,8 @@ class ImageRigidMover(QObject):
             dicom_files: DICOM文件路径列表
             
         Returns:
-            Tuple[float, float, float]: 真实的origin坐标 (x, y, z)
+            Tuple[Optional[List[float]], List[str]]: (真实的origin坐标 (x, y, z), 按z轴投影升序排列的文件列表)
+            无法确定origin时返回 (None, dicom_files)
         """
         try:
             self.logger.info(f"开始分析 {len(dicom_files)} 个DICOM切片以确定真实origin")
@@ -109,17 +127,16 @@ class ImageRigidMover(QObject):
             
             if not slice_data:
                 self.logger.warning("没有找到有效的DICOM切片空间信息")
-                return None
+                return None, dicom_files
                 
-            # 检查是否所有切片的方向都相同
+            # 检查是否所有切片的方向都相同（对(N, 6)矩阵一次性广播比较）
             first_orientation = slice_data[0]['orientation']
-            all_same_orientation = all(
-                np.allclose(s['orientation'], first_orientation, rtol=1e-5, atol=1e-5) 
-                for s in slice_data
-            )
+            orientations = np.array([s['orientation'] for s in slice_data])
+            all_same_orientation = bool(np.allclose(orientations, orientations[0], rtol=1e-5, atol=1e-5))
             
             if not all_same_orientation:
-                self.logger.warning("警告：不是所有切片都具有相同的方向信息")
+                mismatched = np.where(~np.all(np.isclose(orientations, orientations[0], rtol=1e-5, atol=1e-5), axis=1))[0]
+                self.logger.warning(f"警告：不是所有切片都具有相同的方向信息，共 {len(mismatched)} 个切片方向不一致")
                 print("警告：不是所有切片都具有相同的方向信息，将使用第一个切片的方向")
             
             # 根据方向计算z轴向量
@@ -136,12 +153,11 @@ class ImageRigidMover(QObject):
             self.logger.info(f"计算得到的z轴方向向量: {z_vec}")
             print(f"计算得到的z轴方向向量: {z_vec}")
             
-            # 计算每个切片位置在z轴上的投影
-            for slice_info in slice_data:
-                pos = np.array(slice_info['position'])
-                # 计算位置在z轴上的标量投影
-                z_proj = np.dot(pos, z_vec)
-                slice_info['z_projection'] = z_proj
+            # 计算每个切片位置在z轴上的投影（一次矩阵乘法完成）
+            positions = np.array([s['position'] for s in slice_data])
+            proj = positions @ z_vec
+            for slice_info, z_proj in zip(slice_data, proj):
+                slice_info['z_projection'] = float(z_proj)
             
             # 打印所有切片的z投影，帮助调试
             print("\n切片Z轴投影值:")
@@ -151,7 +167,8 @@ class ImageRigidMover(QObject):
                 print(f"... 共有 {len(slice_data)} 个切片")
             
             # 按z轴投影排序
-            slice_data.sort(key=lambda x: x['z_projection'])
+            slice_data = [slice_data[i] for i in np.argsort(proj, kind='stable')]
+            sorted_files = [s['file'] for s in slice_data]
             
             # 选择z轴投影最小的切片作为origin
             min_z_slice = slice_data[0]
@@ -163,12 +180,12 @@ class ImageRigidMover(QObject):
             print(f"来自文件: {os.path.basename(min_z_slice['file'])}")
             print(f"实例编号: {min_z_slice['instance_number']}")
             
-            return true_origin
+            return true_origin, sorted_files
             
         except Exception as e:
             self.logger.error(f"获取切片真实origin时出错: {e}", exc_info=True)
             print(f"获取切片真实origin时出错: {e}")
-            return None
+            return None, dicom_files
     
     def load_directory(self, directory: str, is_fixed: bool = True) -> Tuple[bool, str, Dict]:
         """
@@ -198,13 +215,14 @@ class ImageRigidMover(QObject):
             
             # 直接列出目录中的所有文件，不进行递归
             try:
-                directory_contents = os.listdir(directory)
-                # 只保留文件，排除目录
-                file_names = [f for f in directory_contents if os.path.isfile(os.path.join(directory, f))]
+                # 使用scandir，is_file()可直接利用目录项中的类型信息，避免逐个stat
+                with os.scandir(directory) as it:
+                    # 只保留文件，排除目录
+                    entries = [e for e in it if e.is_file()]
                 # 计算目录中的实际文件数
-                actual_file_count = len(file_names)
+                actual_file_count = len(entries)
                 # 转换为完整路径
-                dicom_candidates = [os.path.join(directory, f) for f in file_names]
+                dicom_candidates = [e.path for e in entries]
             except Exception as e:
                 self.logger.warning(f"列出目录内容时出错: {e}")
                 dicom_candidates = []
@@ -232,13 +250,20 @@ class ImageRigidMover(QObject):
             image_files = []
             rtss_file = None
             
+            # 进度约每1%更新一次，且百分比未变化时不重复发送，减少跨线程信号开销
+            candidate_count = len(dicom_candidates)
+            progress_step = max(1, candidate_count // 100)
+            last_progress = -1
+            
             # 读取每个文件查看其SOPClassUID
             for i, file_path in enumerate(dicom_candidates):
                 try:
                     # 更新进度
-                    if i % 10 == 0:
-                        progress = 10 + int(40 * i / len(dicom_candidates))
-                        self.progress_updated.emit(progress, f"分析DICOM文件 {i+1}/{len(dicom_candidates)}...")
+                    if i % progress_step == 0:
+                        progress = 10 + int(40 * i / candidate_count)
+                        if progress != last_progress:
+                            last_progress = progress
+                            self.progress_updated.emit(progress, f"分析DICOM文件 {i+1}/{candidate_count}...")
                     
                     dcm = pydicom.dcmread(file_path, force=True, stop_before_pixels=True)
                     
@@ -266,13 +291,18 @@ class ImageRigidMover(QObject):
             if image_files:
                 # 从所有DICOM切片获取真实origin
                 self.progress_updated.emit(45, "计算DICOM序列的真实origin...")
-                true_origin = self.get_true_origin_from_slices(image_files)
+                true_origin, sorted_image_files = self.get_true_origin_from_slices(image_files)
+                # 只有所有图像文件都具有空间信息时才使用排序后的列表
+                if len(sorted_image_files) == len(image_files):
+                    image_files = sorted_image_files
+                    data_dict['image_files'] = image_files
             
             # 加载图像文件
             if image_files:
                 self.progress_updated.emit(50, "加载DICOM图像序列...")
                 try:
                     reader = sitk.ImageSeriesReader()
+                    # 文件已按z轴投影排序，无需再调用GetGDCMSeriesFileNames重新扫描文件头
                     reader.SetFileNames(image_files)
                     image = reader.Execute()
                     
@@ -342,9 +372,15 @@ class ImageRigidMover(QObject):
                 self.progress_updated.emit(100, f"成功加载{'固定' if is_fixed else '移动'}图像")
                 self.logger.info(f"成功加载{'固定' if is_fixed else '移动'}图像数据")
                 
-                # 发送图像加载完成信号
-                data_to_emit = data_dict.copy()
-                data_to_emit['is_fixed'] = is_fixed  # 添加is_fixed标志
+                # 发送图像加载完成信号，只携带轻量信息，不传递图像和RTSS对象
+                # 需要实际数据时可通过fixed_data/moving_data获取
+                data_to_emit = {
+                    'image_info': data_dict['image_info'],
+                    'loaded': True,
+                    'has_rtss': data_dict['rtss'] is not None,
+                    'rtss_contour_count': self._count_rtss_contours(data_dict['rtss']) if data_dict['rtss'] is not None else 0,
+                    'is_fixed': is_fixed  # 添加is_fixed标志
+                }
                 self.image_loaded.emit(data_to_emit)
                 
                 return True, "成功加载图像数据", data_dict
@@ -506,7 +542,7 @@ class ImageRigidMover(QObject):
         
         print("=======================================\n")
         
-    def perform_rigid_transform(self, output_dir: str, output_image=True, output_rtss=True) -> Tuple[bool, str]:
+    def perform_rigid_transform(self, output_dir: str, output_image=True, output_rtss=True, compress_image=False) -> Tuple[bool, str]:
         """
         执行刚体变换，并将结果保存到指定目录
         
@@ -514,6 +550,7 @@ class ImageRigidMover(QObject):
             output_dir: 输出目录路径
             output_image: 是否输出变换后的图像
             output_rtss: 是否输出变换后的RTSS
+            compress_image: 是否以Deflate无损压缩传输语法保存图像
             
         Returns:
             Tuple[bool, str]: (成功标志, 消息)
@@ -543,6 +580,9 @@ class ImageRigidMover(QObject):
             ry = self.transform_params['ry']
             rz = self.transform_params['rz']
             
+            # 判断是否为恒等变换（所有参数为0）
+            is_identity = tx == ty == tz == 0 and rx == ry == rz == 0
+            
             # 准备用于存储结果的变量
             transformed_image = None
             transformed_rtss = None
@@ -569,33 +609,41 @@ class ImageRigidMover(QObject):
                     print(f"Fixed真实原点: {fixed_true_origin}")
                 print(f"变换参数: 平移=({tx}, {ty}, {tz})mm")
                 
-                # 创建平移变换对象
-                print("\n===== 创建平移变换 =====")
-                transform = self._create_rigid_transform(tx, ty, tz, rx, ry, rz)
-                print(f"变换参数: {transform.GetParameters()}")
+                # 参数全为0且两幅图像网格一致时，重采样结果与移动图像相同，直接跳过
+                if is_identity and self._same_image_grid(moving_image, fixed_image):
+                    self.logger.info("恒等变换且图像网格一致，跳过重采样")
+                    transformed_image = moving_image
+                else:
+                    # 创建平移变换对象
+                    print("\n===== 创建平移变换 =====")
+                    transform = self._create_rigid_transform(tx, ty, tz, rx, ry, rz)
+                    print(f"变换参数: {transform.GetParameters()}")
                 
-                # 重采样到fixed图像空间
-                self.progress_updated.emit(30, "重采样到固定图像空间...")
-                print("===== 开始重采样 =====")
-                resampler = sitk.ResampleImageFilter()
-                resampler.SetReferenceImage(fixed_image)  # 使用fixed_image的尺寸和间距
-                resampler.SetInterpolator(sitk.sitkLinear)
-                resampler.SetDefaultPixelValue(0)
-                resampler.SetTransform(transform)
+                    # 重采样到fixed图像空间
+                    self.progress_updated.emit(30, "重采样到固定图像空间...")
+                    print("===== 开始重采样 =====")
+                    resampler = sitk.ResampleImageFilter()
+                    resampler.SetReferenceImage(fixed_image)  # 使用fixed_image的尺寸和间距
+                    resampler.SetInterpolator(sitk.sitkLinear)
+                    resampler.SetDefaultPixelValue(0)
+                    # 输出像素类型显式写为移动图像的类型（如CT的int16），与滤波器默认行为相同，只为便于阅读
+                    resampler.SetOutputPixelType(moving_image.GetPixelID())
+                    resampler.SetTransform(transform)
                 
-                transformed_image = resampler.Execute(moving_image)
+                    transformed_image = resampler.Execute(moving_image)
                 
-                # 打印重采样后信息
-                print("===== 重采样完成 =====")
-                print(f"重采样后图像: origin={transformed_image.GetOrigin()}, spacing={transformed_image.GetSpacing()}, size={transformed_image.GetSize()}")
-                print(f"与Fixed对比: origin差异={np.array(transformed_image.GetOrigin()) - np.array(fixed_image.GetOrigin())}")
+                    # 打印重采样后信息
+                    print("===== 重采样完成 =====")
+                    print(f"重采样后图像: origin={transformed_image.GetOrigin()}, spacing={transformed_image.GetSpacing()}, size={transformed_image.GetSize()}")
+                    print(f"与Fixed对比: origin差异={np.array(transformed_image.GetOrigin()) - np.array(fixed_image.GetOrigin())}")
                 
-                # 检查图像内容
-                img_array = sitk.GetArrayFromImage(transformed_image)
-                non_zero = np.count_nonzero(img_array)
-                total_pixels = img_array.size
-                print(f"图像内容: 非零像素占比 {non_zero/total_pixels*100:.2f}%")
-                print(f"像素值范围: [{np.min(img_array)}, {np.max(img_array)}]")
+                    # 检查图像内容（需要遍历整个体数据，仅在DEBUG级别下执行）
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        img_array = sitk.GetArrayViewFromImage(transformed_image)
+                        non_zero = np.count_nonzero(img_array)
+                        total_pixels = img_array.size
+                        self.logger.debug(f"图像内容: 非零像素占比 {non_zero/total_pixels*100:.2f}%")
+                        self.logger.debug(f"像素值范围: [{img_array.min()}, {img_array.max()}]")
                 
                 # 保存变换后的图像
                 self.progress_updated.emit(40, "正在保存变换后的图像...")
@@ -605,7 +653,8 @@ class ImageRigidMover(QObject):
                     transformed_image, 
                     output_dir, 
                     "transformed_image",
-                    self.moving_data['image_files'][0]
+                    self.moving_data['image_files'][0],
+                    compress=compress_image
                 )
                 
                 if not save_success:
@@ -620,8 +669,12 @@ class ImageRigidMover(QObject):
                 # 获取移动RTSS
                 moving_rtss = self.moving_data['rtss']
                 
-                # 变换RTSS
-                transformed_rtss = self._transform_rtss(moving_rtss, tx, ty, tz, rx, ry, rz)
+                # 变换RTSS，恒等变换时直接使用原RTSS
+                if is_identity:
+                    self.logger.info("恒等变换，跳过RTSS轮廓变换")
+                    transformed_rtss = moving_rtss
+                else:
+                    transformed_rtss = self._transform_rtss(moving_rtss, tx, ty, tz, rx, ry, rz)
                 
                 # 保存变换后的RTSS
                 self.progress_updated.emit(80, "正在保存变换后的RTSS...")
@@ -648,6 +701,15 @@ class ImageRigidMover(QObject):
             self.progress_updated.emit(0, f"错误: {error_msg}")
             return False, error_msg
     
+    def _same_image_grid(self, image_a: sitk.Image, image_b: sitk.Image) -> bool:
+        """判断两幅图像是否具有相同的尺寸、间距、原点和方向"""
+        return (
+            image_a.GetSize() == image_b.GetSize()
+            and np.allclose(image_a.GetSpacing(), image_b.GetSpacing())
+            and np.allclose(image_a.GetOrigin(), image_b.GetOrigin())
+            and np.allclose(image_a.GetDirection(), image_b.GetDirection())
+        )
+    
     def _create_rigid_transform(self, tx, ty, tz, rx, ry, rz):
         """
         创建只做平移的3D变换（不做旋转）
@@ -708,12 +770,25 @@ class ImageRigidMover(QObject):
         Returns:
             pydicom.Dataset: 变换后的RTSS数据
         """
-        transformed_rtss = rtss_data.copy()
-        def transform_point(point):
-            x, y, z = point
-            return (x + tx, y + ty, z + tz)
+        # 新建数据集并update，只深拷贝需要修改的ROIContourSequence，其余元素共享引用
+        # 注意pydicom的copy.copy会共享内部元素字典，这里用update得到独立的数据集
+        transformed_rtss = pydicom.Dataset()
+        transformed_rtss.update(rtss_data)
+        if hasattr(rtss_data, 'file_meta'):
+            transformed_rtss.file_meta = FileMetaDataset()
+            transformed_rtss.file_meta.update(rtss_data.file_meta)
+        # 保留原文件的前导码，保存时与原RTSS的文件格式一致
+        transformed_rtss.preamble = getattr(rtss_data, 'preamble', None)
+        if hasattr(rtss_data, 'ROIContourSequence'):
+            # update后的元素对象与原数据共享，先删除再重新赋值，否则赋值会直接修改原数据中的同一元素
+            del transformed_rtss.ROIContourSequence
+            transformed_rtss.ROIContourSequence = copy.deepcopy(rtss_data.ROIContourSequence)
         if not hasattr(transformed_rtss, 'ROIContourSequence'):
             return transformed_rtss
+        # 第一遍：收集所有轮廓，将ContourData拼接成一个(K, 3)数组
+        contours = []
+        lengths = []
+        flat = []
         for roi_contour in transformed_rtss.ROIContourSequence:
             if not hasattr(roi_contour, 'ContourSequence'):
                 continue
@@ -722,28 +797,34 @@ class ImageRigidMover(QObject):
                     continue
                 contour_data = contour.ContourData
                 num_points = len(contour_data) // 3
-                transformed_points = []
-                for i in range(num_points):
-                    x = float(contour_data[i*3])
-                    y = float(contour_data[i*3 + 1])
-                    z = float(contour_data[i*3 + 2])
-                    x_new, y_new, z_new = transform_point((x, y, z))
-                    transformed_points.extend([x_new, y_new, z_new])
-                contour.ContourData = transformed_points
+                contours.append(contour)
+                lengths.append(num_points * 3)
+                flat.append(np.asarray(contour_data[:num_points * 3], dtype=np.float64))
+        if not contours:
+            return transformed_rtss
+        # 第二遍：对整个结构集一次性加上平移量
+        all_points = np.concatenate(flat).reshape(-1, 3)
+        all_points += np.array([tx, ty, tz], dtype=np.float64)
+        all_points = all_points.ravel()
+        # 第三遍：按原顺序拆分并写回各轮廓
+        for contour, points in zip(contours, np.split(all_points, np.cumsum(lengths)[:-1])):
+            contour.ContourData = points.tolist()
         return transformed_rtss
     
-    def _save_image_as_dicom(self, image: sitk.Image, output_dir: str, base_name: str, reference_dicom_file: str) -> Tuple[bool, str]:
+    def _save_image_as_dicom(self, image: sitk.Image, output_dir: str, base_name: str, reference_dicom_file: str, compress: bool = False) -> Tuple[bool, str]:
         """
         将图像保存为DICOM格式，只继承第一个参考DICOM的全局关键信息，重建像素和空间信息。
         保证所有图像切片属于同一序列，能被DICOM查看器作为一个序列加载。
         使用正确的origin计算每个切片的ImagePositionPatient。
+        compress为True时使用Deflated Explicit VR Little Endian传输语法（无损），减小输出文件体积。
         """
         try:
             image_output_dir = os.path.join(output_dir, base_name)
             if not os.path.exists(image_output_dir):
                 os.makedirs(image_output_dir)
                 
-            image_array = sitk.GetArrayFromImage(image)
+            # 只读取像素，使用零拷贝视图；需要的类型转换在下面对整个体数据一次完成
+            image_array = sitk.GetArrayViewFromImage(image)
             size = image.GetSize()
             spacing = image.GetSpacing()
             origin = image.GetOrigin()
@@ -755,14 +836,13 @@ class ImageRigidMover(QObject):
             
             # 记录原始模态信息
             original_modality = ref_dcm.get('Modality', 'CT')
-            self.logger.info(f"原始图像模态: {original_modality}")
-            print(f"原始图像模态: {original_modality}")
-            
-            # 打印origin信息用于调试
-            print(f"\n===== 保存DICOM图像 =====")
-            print(f"图像origin: {origin}")
-            print(f"方向矩阵: {direction}")
-            print(f"切片数量: {num_slices}")
+            # 只记录一条汇总日志，替代原来的logger与print重复输出
+            info_enabled = self.logger.isEnabledFor(logging.INFO)
+            if info_enabled:
+                self.logger.info(
+                    f"保存DICOM图像: 原始图像模态={original_modality}, 图像origin={origin}, "
+                    f"方向矩阵={direction}, 切片数量={num_slices}"
+                )
 
             # 要保留的全局关键标签列表
             # 确保包含所有序列相关标签
@@ -789,151 +869,196 @@ class ImageRigidMover(QObject):
             else:
                 sop_class_uid = '1.2.840.10008.5.1.4.1.1.2'  # 默认为CT Image Storage
                 
-            self.logger.info(f"使用模态: {modality}, SOPClassUID: {sop_class_uid}")
-            print(f"使用模态: {modality}, SOPClassUID: {sop_class_uid}")
-            print(f"新序列UID: {new_series_uid}")
-            print(f"新帧参考UID: {new_frame_of_reference_uid}")
+            if info_enabled:
+                self.logger.info(
+                    f"使用模态: {modality}, SOPClassUID: {sop_class_uid}, "
+                    f"新序列UID: {new_series_uid}, 新帧参考UID: {new_frame_of_reference_uid}"
+                )
                 
             # 以升序命名文件，确保DICOM浏览器能正确排序
             # 使用统一的命名前缀，许多PACS系统依赖这种命名约定识别序列
             file_prefix = "IM"  # 标准DICOM命名前缀
             
-            # 计算所有切片的ImagePositionPatient，并按Z位置排序
-            slice_positions = []
-            for i in range(num_slices):
-                position = self.compute_image_position(origin, direction, i, spacing)
-                # 仅使用Z坐标进行排序
-                slice_positions.append((i, position, position[2]))
-                if i < 3 or i >= num_slices - 3:
-                    print(f"切片 {i}: 位置={position}")
+            # 一次性计算所有切片的ImagePositionPatient，并按Z位置排序
+            positions = self.compute_image_positions(origin, direction, num_slices, spacing)
             
-            # 按Z位置排序，确保切片按解剖位置排序
-            slice_positions.sort(key=lambda x: x[2])
-            slice_order = [idx for idx, _, _ in slice_positions]
-            is_ascending = slice_positions[0][2] < slice_positions[-1][2]
+            # 按Z位置排序（仅使用Z坐标），确保切片按解剖位置排序
+            z_positions = positions[:, 2]
+            slice_order = np.argsort(z_positions, kind='stable')
+            is_ascending = z_positions[slice_order[0]] < z_positions[slice_order[-1]]
             
             self.logger.info(f"保存DICOM序列，切片数: {num_slices}，顺序方向: {'升序' if is_ascending else '降序'}")
-            print(f"切片顺序方向: {'升序' if is_ascending else '降序'}")
             
-            # 保存每个切片
-            for slice_idx, (original_idx, position, _) in enumerate(slice_positions):
-                # 创建新的DICOM对象
-                dcm = pydicom.Dataset()
-                
-                # 复制全局标签
-                for tag in global_tags:
-                    if hasattr(ref_dcm, tag):
-                        setattr(dcm, tag, getattr(ref_dcm, tag))
-                
-                # 设置序列相关信息 - 所有切片必须共享这些值
-                dcm.SeriesInstanceUID = new_series_uid
-                dcm.SeriesDescription = series_description
-                dcm.SeriesNumber = series_number
-                dcm.SeriesDate = getattr(ref_dcm, 'SeriesDate', getattr(ref_dcm, 'StudyDate', ''))
-                dcm.SeriesTime = getattr(ref_dcm, 'SeriesTime', getattr(ref_dcm, 'StudyTime', ''))
-                
-                # 设置模态信息
-                dcm.Modality = modality
-                
-                # 设置SOPClassUID和MediaStorageSOPClassUID
-                dcm.SOPClassUID = sop_class_uid
-                
-                # 设置file_meta信息
-                dcm.file_meta = pydicom.Dataset()
-                dcm.file_meta.MediaStorageSOPClassUID = sop_class_uid
-                dcm.SOPInstanceUID = pydicom.uid.generate_uid()
-                dcm.file_meta.MediaStorageSOPInstanceUID = dcm.SOPInstanceUID
-                dcm.file_meta.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
-                dcm.file_meta.ImplementationClassUID = pydicom.uid.PYDICOM_IMPLEMENTATION_UID
-                
-                # 设置FrameOfReferenceUID - 所有切片必须共享此值
-                dcm.FrameOfReferenceUID = new_frame_of_reference_uid
-                
-                # 设置图像类型
-                dcm.ImageType = ["DERIVED", "SECONDARY"]
-                
-                # 设置图像空间信息
-                dcm.Rows = size[1]
-                dcm.Columns = size[0]
-                dcm.PixelSpacing = [spacing[1], spacing[0]]
-                dcm.SliceThickness = spacing[2]
-                dcm.SpacingBetweenSlices = spacing[2]
-                
-                # 使用预先计算的位置信息
-                dcm.ImagePositionPatient = [float(v) for v in position]
-                
-                # 设置图像方向
-                image_orientation = [direction[0], direction[3], direction[6], direction[1], direction[4], direction[7]]
-                dcm.ImageOrientationPatient = [float(v) for v in image_orientation]
-                
-                # 设置切片位置
-                dcm.SliceLocation = float(position[2])
-                
-                # 设置实例编号 - 按切片顺序递增，从1开始
-                dcm.InstanceNumber = slice_idx + 1
-                
-                # 设置切片数据
-                slice_data = image_array[original_idx, :, :]
-                
-                # 根据需要调整数据类型
-                pixels_min = np.min(slice_data)
-                pixels_max = np.max(slice_data)
-                
-                # 设置窗宽窗位
-                if hasattr(ref_dcm, 'WindowCenter') and hasattr(ref_dcm, 'WindowWidth'):
-                    dcm.WindowCenter = ref_dcm.WindowCenter
-                    dcm.WindowWidth = ref_dcm.WindowWidth
-                else:
-                    dcm.WindowCenter = (pixels_max + pixels_min) // 2
-                    dcm.WindowWidth = pixels_max - pixels_min
+            # 根据整个体数据的取值范围一次性确定像素类型，并对整个体数据做一次转换
+            # 之后每个切片只需取视图，避免逐切片重复计算min/max和缩放
+            # 像素类型本身可安全转换为int16（如int16/uint8/int8）时无需扫描数据范围
+            if np.can_cast(image_array.dtype, np.int16, casting='safe'):
+                volume_min = volume_max = None
+                use_int16 = True
+            else:
+                volume_min = float(image_array.min())
+                volume_max = float(image_array.max())
+                use_int16 = volume_min >= -32768 and volume_max <= 32767
+            # 常量体数据时所有切片共享同一份全零像素缓冲区
+            constant_slice_bytes = None
+            if use_int16:
+                # 使用16位有符号整数
+                pixel_volume = image_array.astype(np.int16, copy=False)
+                rescale_slope = None
+                rescale_intercept = None
+            elif volume_min != volume_max:
+                # 否则使用缩放来适应无符号16位范围，四舍五入并限制在合理范围内
+                rescale_slope = (volume_max - volume_min) / 65534
+                rescale_intercept = volume_min
+                inv_slope = 65534.0 / (volume_max - volume_min)
+                # 在同一个临时缓冲区上原地完成减、乘、加和截断，避免多次分配整卷临时数组
+                scaled = np.subtract(image_array, rescale_intercept, dtype=np.float64)
+                scaled *= inv_slope
+                scaled += 0.5
+                np.clip(scaled, 0, 65535, out=scaled)
+                pixel_volume = scaled.astype(np.uint16)
+                del scaled
+            else:
+                # 如果所有像素值相同，存储值全为0，真实值完全由RescaleIntercept表示
+                # 无需分配整卷数组，只生成一个切片大小的全零字节串供所有切片共用
+                pixel_volume = None
+                constant_slice_bytes = bytes(image_array.shape[1] * image_array.shape[2] * 2)
+                rescale_slope = 1.0
+                rescale_intercept = volume_min
+            # 确保体数据内存连续，使每个切片都是可直接引用的连续缓冲区
+            if pixel_volume is not None:
+                pixel_volume = np.ascontiguousarray(pixel_volume)
+            # 之后只使用pixel_volume，释放对原始数组的引用以降低峰值内存
+            del image_array
+            
+            # 构建包含所有切片共享标签的模板数据集，每个切片只需复制模板并设置变化的字段
+            series_date = getattr(ref_dcm, 'SeriesDate', getattr(ref_dcm, 'StudyDate', ''))
+            series_time = getattr(ref_dcm, 'SeriesTime', getattr(ref_dcm, 'StudyTime', ''))
+            dcm_template = pydicom.Dataset()
+            
+            # 复制全局标签
+            for tag in global_tags:
+                if hasattr(ref_dcm, tag):
+                    setattr(dcm_template, tag, getattr(ref_dcm, tag))
+            
+            # 设置序列相关信息 - 所有切片必须共享这些值
+            dcm_template.SeriesInstanceUID = new_series_uid
+            dcm_template.SeriesDescription = series_description
+            dcm_template.SeriesNumber = series_number
+            dcm_template.SeriesDate = series_date
+            dcm_template.SeriesTime = series_time
+            
+            # 设置模态信息
+            dcm_template.Modality = modality
+            
+            # 设置SOPClassUID
+            dcm_template.SOPClassUID = sop_class_uid
+            
+            # 设置FrameOfReferenceUID - 所有切片必须共享此值
+            dcm_template.FrameOfReferenceUID = new_frame_of_reference_uid
+            
+            # 设置图像类型
+            dcm_template.ImageType = ["DERIVED", "SECONDARY"]
+            
+            # 设置图像空间信息
+            dcm_template.Rows = size[1]
+            dcm_template.Columns = size[0]
+            dcm_template.PixelSpacing = [spacing[1], spacing[0]]
+            dcm_template.SliceThickness = spacing[2]
+            dcm_template.SpacingBetweenSlices = spacing[2]
+            
+            # 设置图像方向
+            dcm_template.ImageOrientationPatient = [float(direction[i]) for i in (0, 3, 6, 1, 4, 7)]
+            
+            # 设置像素格式
+            dcm_template.BitsAllocated = 16
+            dcm_template.BitsStored = 16
+            dcm_template.HighBit = 15
+            if use_int16:
+                dcm_template.PixelRepresentation = 1  # 有符号整数
+            else:
+                dcm_template.RescaleSlope = rescale_slope
+                dcm_template.RescaleIntercept = rescale_intercept
+                dcm_template.PixelRepresentation = 0  # 无符号整数
+            dcm_template.SamplesPerPixel = 1
+            dcm_template.PhotometricInterpretation = "MONOCHROME2"
+            
+            # 设置窗宽窗位：优先使用参考DICOM的值，否则使用整个体数据的取值范围
+            if hasattr(ref_dcm, 'WindowCenter') and hasattr(ref_dcm, 'WindowWidth'):
+                dcm_template.WindowCenter = ref_dcm.WindowCenter
+                dcm_template.WindowWidth = ref_dcm.WindowWidth
+            else:
+                if volume_min is None:
+                    volume_min = float(pixel_volume.min())
+                    volume_max = float(pixel_volume.max())
+                dcm_template.WindowCenter = (volume_max + volume_min) // 2
+                dcm_template.WindowWidth = volume_max - volume_min
+            
+            # file_meta模板（MediaStorageSOPClassUID等）
+            file_meta_template = FileMetaDataset()
+            file_meta_template.MediaStorageSOPClassUID = sop_class_uid
+            if compress:
+                file_meta_template.TransferSyntaxUID = pydicom.uid.DeflatedExplicitVRLittleEndian
+            else:
+                file_meta_template.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
+            file_meta_template.ImplementationClassUID = pydicom.uid.PYDICOM_IMPLEMENTATION_UID
+            
+            # 预先生成所有切片的输出文件路径
+            output_files = [os.path.join(image_output_dir, f"{file_prefix}{i + 1:04d}.dcm") for i in range(num_slices)]
+            
+            # 一次性生成所有切片的SOPInstanceUID：在一个随机UID根后追加切片序号
+            # 截断根部以保证总长度不超过DICOM规定的64个字符
+            instance_uid_root = pydicom.uid.generate_uid()[:64 - len(str(num_slices)) - 1].rstrip('.')
+            sop_instance_uids = [pydicom.uid.UID(f"{instance_uid_root}.{i + 1}") for i in range(num_slices)]
+            
+            # 数据集按顺序构建，写文件交给线程池并行执行（写盘时会释放GIL）
+            # 退出with时等待所有写入完成并关闭线程池，构建过程中出错也不会遗留线程
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+                futures = []
                 
-                # 如果图像数据范围较小，可以使用16位整数
-                if pixels_min >= -32768 and pixels_max <= 32767:
-                    # 使用16位有符号整数
-                    slice_data = slice_data.astype(np.int16)
-                    dcm.BitsAllocated = 16
-                    dcm.BitsStored = 16
-                    dcm.HighBit = 15
-                    dcm.PixelRepresentation = 1  # 有符号整数
-                else:
-                    # 否则使用32位浮点数，需要转换为DICOM支持的格式
-                    # 找到合适的缩放比例
-                    if pixels_min != pixels_max:
-                        rescale_slope = (pixels_max - pixels_min) / 65534
-                        rescale_intercept = pixels_min
-                        # 使用缩放来适应16位范围
-                        rescaled_data = (slice_data - rescale_intercept) / rescale_slope
-                        # 四舍五入并限制在合理范围内
-                        slice_data = np.clip(np.round(rescaled_data), 0, 65535).astype(np.uint16)
-                        dcm.RescaleSlope = float(rescale_slope)
-                        dcm.RescaleIntercept = float(rescale_intercept)
+                # 保存每个切片
+                for slice_idx, original_idx in enumerate(slice_order):
+                    position = positions[original_idx].tolist()
+                    # 从模板创建新的DICOM对象
+                    # 注意pydicom的copy.copy会共享内部元素字典，这里用update得到独立的数据集
+                    dcm = pydicom.Dataset()
+                    dcm.update(dcm_template)
+                    dcm.file_meta = FileMetaDataset()
+                    dcm.file_meta.update(file_meta_template)
+                    
+                    # 设置每个切片独立的SOPInstanceUID
+                    dcm.SOPInstanceUID = sop_instance_uids[slice_idx]
+                    dcm.file_meta.MediaStorageSOPInstanceUID = dcm.SOPInstanceUID
+                    
+                    # 使用预先计算的位置信息
+                    dcm.ImagePositionPatient = [float(v) for v in position]
+                    
+                    # 设置切片位置
+                    dcm.SliceLocation = float(position[2])
+                    
+                    # 设置实例编号 - 按切片顺序递增，从1开始
+                    dcm.InstanceNumber = slice_idx + 1
+                    
+                    # 设置像素数据：直接引用连续体数据缓冲区中的切片，不再用tobytes()复制
+                    # 每个切片字节数为Rows*Columns*2，总为偶数，无需补齐
+                    if constant_slice_bytes is not None:
+                        dcm.PixelData = constant_slice_bytes
                     else:
-                        # 如果所有像素值相同
-                        slice_data = np.zeros_like(slice_data, dtype=np.uint16)
-                        dcm.RescaleSlope = 1.0
-                        dcm.RescaleIntercept = pixels_min
+                        dcm.PixelData = memoryview(pixel_volume[original_idx]).cast('B')
                     
-                    dcm.BitsAllocated = 16
-                    dcm.BitsStored = 16
-                    dcm.HighBit = 15
-                    dcm.PixelRepresentation = 0  # 无符号整数
-                
-                # 设置像素数据
-                dcm.SamplesPerPixel = 1
-                dcm.PhotometricInterpretation = "MONOCHROME2"
-                dcm.PixelData = slice_data.tobytes()
-                
-                # 使用标准的DICOM文件命名约定，确保切片能正确排序
-                output_file = os.path.join(image_output_dir, f"{file_prefix}{slice_idx+1:04d}.dcm")
-                dcm.save_as(output_file)
+                    # 使用标准的DICOM文件命名约定，确保切片能正确排序
+                    output_file = output_files[slice_idx]
+                    futures.append(executor.submit(self._write_image_slice, dcm, output_file))
+                    
+                    # 记录前几个和最后几个切片的信息
+                    if info_enabled and (slice_idx < 3 or slice_idx >= num_slices - 3):
+                        self.logger.info(f"保存切片 {slice_idx+1}/{num_slices}: 位置={position}, 文件={os.path.basename(output_file)}")
                 
-                # 打印前几个和最后几个切片的信息
-                if slice_idx < 3 or slice_idx >= num_slices - 3:
-                    print(f"保存切片 {slice_idx+1}/{num_slices}: 位置={position}, 文件={os.path.basename(output_file)}")
+                # 任何切片写入失败都会在此处抛出异常
+                for future in futures:
+                    future.result()
             
-            self.logger.info(f"成功将图像保存为DICOM序列，共 {num_slices} 个切片，保存到 {image_output_dir}")
-            print(f"成功将图像保存为DICOM序列，共 {num_slices} 个切片，保存到 {image_output_dir}")
-            print(f"所有切片共享同一SeriesInstanceUID: {new_series_uid}")
+            self.logger.info(f"成功将图像保存为DICOM序列，共 {num_slices} 个切片，保存到 {image_output_dir}，SeriesInstanceUID: {new_series_uid}")
             return True, image_output_dir
             
         except Exception as e:
@@ -941,6 +1066,40 @@ class ImageRigidMover(QObject):
             self.logger.error(error_msg, exc_info=True)
             return False, error_msg
     
+    def _write_image_slice(self, dcm: pydicom.Dataset, output_file: str):
+        """
+        将单个图像切片写为DICOM文件
+        切片数据集结构简单（无嵌套序列），先在内存缓冲区中完成序列化，再一次性写入磁盘，
+        避免通用写入流程中逐个标签的文件写入和回跳
+        
+        Args:
+            dcm: 切片数据集（需包含file_meta）
+            output_file: 输出文件路径
+        """
+        meta_buffer = DicomBytesIO()
+        meta_buffer.is_little_endian = True
+        meta_buffer.is_implicit_VR = False
+        write_file_meta_info(meta_buffer, dcm.file_meta, enforce_standard=True)
+        
+        buffer = DicomBytesIO()
+        buffer.is_little_endian = True
+        buffer.is_implicit_VR = False
+        write_dataset(buffer, dcm)
+        payload = buffer.getvalue()
+        
+        # Deflate传输语法：对file_meta之后的整个数据集做原始deflate压缩（无zlib头）
+        if dcm.file_meta.TransferSyntaxUID == pydicom.uid.DeflatedExplicitVRLittleEndian:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+            payload = compressor.compress(payload) + compressor.flush()
+            if len(payload) % 2:
+                payload += b'\x00'
+        
+        with open(output_file, 'wb') as f:
+            f.write(b'\x00' * 128)  # 文件前导
+            f.write(b'DICM')
+            f.write(meta_buffer.getvalue())
+            f.write(payload)
+    
     def _save_rtss_as_dicom(self, rtss_data, output_dir: str, base_name: str) -> Tuple[bool, str]:
         """
         将RTSS保存为DICOM文件
@@ -987,8 +1146,8 @@ class ImageRigidMover(QObject):
                 self.logger.warning("RTSS数据不存在或没有轮廓序列")
                 return None
                 
-            # 所有轮廓点的列表
-            all_points = []
+            # 各轮廓的坐标缓冲区，最后拼接后一次性归约
+            buffers = []
             
             # 遍历所有ROI轮廓
             for roi_contour in rtss_data.ROIContourSequence:
@@ -1003,21 +1162,18 @@ class ImageRigidMover(QObject):
                     # 获取轮廓点（每3个数值为一个点的x,y,z坐标）
                     contour_data = contour.ContourData
                     num_points = len(contour_data) // 3
+                    if num_points == 0:
+                        continue
                     
-                    for i in range(num_points):
-                        x = float(contour_data[i*3])
-                        y = float(contour_data[i*3 + 1])
-                        z = float(contour_data[i*3 + 2])
-                        all_points.append((x, y, z))
+                    buffers.append(np.asarray(contour_data[:num_points * 3], dtype=np.float64))
             
-            if not all_points:
+            if not buffers:
                 self.logger.warning("未找到有效的轮廓点")
                 return None
                 
-            # 计算质心
-            centroid_x = sum(p[0] for p in all_points) / len(all_points)
-            centroid_y = sum(p[1] for p in all_points) / len(all_points)
-            centroid_z = sum(p[2] for p in all_points) / len(all_points)
+            # 计算质心（对所有轮廓点只做一次归约）
+            all_points = np.concatenate(buffers).reshape(-1, 3)
+            centroid_x, centroid_y, centroid_z = (float(v) for v in all_points.mean(axis=0))
             
             self.logger.info(f"计算得到质心坐标: ({centroid_x}, {centroid_y}, {centroid_z})")
             return (centroid_x, centroid_y, centroid_z)
@@ -1059,16 +1215,6 @@ class ImageRigidMover(QObject):
             fixed_origin = fixed_image.GetOrigin()
             moving_origin = moving_image.GetOrigin()
             
-            # 详细打印原始值
-            print("\n【图像原点】")
-            print(f"Fixed图像原点: X={fixed_origin[0]:.2f}, Y={fixed_origin[1]:.2f}, Z={fixed_origin[2]:.2f}")
-            print(f"Moving图像原点: X={moving_origin[0]:.2f}, Y={moving_origin[1]:.2f}, Z={moving_origin[2]:.2f}")
-            print(f"!!! Z轴值: Fixed Z={fixed_origin[2]:.2f}, Moving Z={moving_origin[2]:.2f}")
-            
-            print("\n【轮廓质心】")
-            print(f"Fixed轮廓质心: X={fixed_centroid[0]:.2f}, Y={fixed_centroid[1]:.2f}, Z={fixed_centroid[2]:.2f}")
-            print(f"Moving轮廓质心: X={moving_centroid[0]:.2f}, Y={moving_centroid[1]:.2f}, Z={moving_centroid[2]:.2f}")
-            
             # 计算将Moving图像变换到Fixed图像需要的参数
             # 原点差异 (Moving需要向哪个方向移动才能让原点对齐)
             # 正确方向: Fixed - Moving (表示Moving需要增加多少才能等于Fixed)
@@ -1076,49 +1222,43 @@ class ImageRigidMover(QObject):
             origin_diff_y = fixed_origin[1] - moving_origin[1] 
             origin_diff_z = fixed_origin[2] - moving_origin[2]  # Z轴可能有很大的差异
             
-            print("\n【原点差异】(Fixed - Moving)")
-            print(f"X轴原点差异: {origin_diff_x:.2f}mm")
-            print(f"Y轴原点差异: {origin_diff_y:.2f}mm")
-            print(f"Z轴原点差异: {origin_diff_z:.2f}mm")
-            
             # 质心差异 (将Moving轮廓配准到Fixed轮廓的平移量)
             centroid_diff_x = fixed_centroid[0] - moving_centroid[0]
             centroid_diff_y = fixed_centroid[1] - moving_centroid[1]
             centroid_diff_z = fixed_centroid[2] - moving_centroid[2]
             
-            print("\n【质心差异】")
-            print(f"X轴质心差异: {centroid_diff_x:.2f}mm")
-            print(f"Y轴质心差异: {centroid_diff_y:.2f}mm")
-            print(f"Z轴质心差异: {centroid_diff_z:.2f}mm")
-            
             # 计算总平移量
             tx = centroid_diff_x + origin_diff_x
             ty = centroid_diff_y + origin_diff_y
             tz = centroid_diff_z + origin_diff_z
             
-            print("\n【平移计算】")
-            print(f"X平移 = 质心差异({centroid_diff_x:.2f}) + 原点差异({origin_diff_x:.2f}) = {tx:.2f}mm")
-            print(f"Y平移 = 质心差异({centroid_diff_y:.2f}) + 原点差异({origin_diff_y:.2f}) = {ty:.2f}mm")
-            print(f"Z平移 = 质心差异({centroid_diff_z:.2f}) + 原点差异({origin_diff_z:.2f}) = {tz:.2f}mm")
+            # 详细计算过程只在DEBUG级别下格式化输出，避免无谓的字符串格式化和I/O
+            if self.logger.isEnabledFor(logging.DEBUG):
+                # 计算移动后的预期结果
+                predicted_new_origin = (
+                    moving_origin[0] + tx,
+                    moving_origin[1] + ty,
+                    moving_origin[2] + tz
+                )
+                self.logger.debug(
+                    "质心配准计算详情:\n"
+                    f"【图像原点】Fixed: X={fixed_origin[0]:.2f}, Y={fixed_origin[1]:.2f}, Z={fixed_origin[2]:.2f}; "
+                    f"Moving: X={moving_origin[0]:.2f}, Y={moving_origin[1]:.2f}, Z={moving_origin[2]:.2f}\n"
+                    f"【轮廓质心】Fixed: X={fixed_centroid[0]:.2f}, Y={fixed_centroid[1]:.2f}, Z={fixed_centroid[2]:.2f}; "
+                    f"Moving: X={moving_centroid[0]:.2f}, Y={moving_centroid[1]:.2f}, Z={moving_centroid[2]:.2f}\n"
+                    f"【原点差异】(Fixed - Moving): ({origin_diff_x:.2f}, {origin_diff_y:.2f}, {origin_diff_z:.2f})mm\n"
+                    f"【质心差异】({centroid_diff_x:.2f}, {centroid_diff_y:.2f}, {centroid_diff_z:.2f})mm\n"
+                    f"【平移计算】质心差异 + 原点差异 = ({tx:.2f}, {ty:.2f}, {tz:.2f})mm\n"
+                    f"【预测结果检验】移动后的预期原点: ({predicted_new_origin[0]:.2f}, {predicted_new_origin[1]:.2f}, {predicted_new_origin[2]:.2f}), "
+                    f"与Fixed原点的偏差: ({predicted_new_origin[0]-fixed_origin[0]:.2f}, {predicted_new_origin[1]-fixed_origin[1]:.2f}, {predicted_new_origin[2]-fixed_origin[2]:.2f})"
+                )
             
             # 检查大偏移并警告
             if abs(origin_diff_z) > 500 or abs(tz) > 500:
-                print(f"\n!!! 警告: Z轴有大幅偏移 !!!")
-                print(f"Z轴移动: {tz:.2f}mm (从{moving_origin[2]:.2f}移动到约{moving_origin[2]+tz:.2f})")
-                print(f"这将使Moving Z轴从{moving_origin[2]:.2f}变为{moving_origin[2]+tz:.2f}，而Fixed Z轴是{fixed_origin[2]:.2f}")
-                print(f"确保GUI的Z轴平移范围设置为±2000mm")
-            
-            # 计算移动后的预期结果
-            predicted_new_origin = (
-                moving_origin[0] + tx,
-                moving_origin[1] + ty,
-                moving_origin[2] + tz
-            )
-            
-            print("\n【预测结果检验】")
-            print(f"移动后的预期原点: ({predicted_new_origin[0]:.2f}, {predicted_new_origin[1]:.2f}, {predicted_new_origin[2]:.2f})")
-            print(f"Fixed目标原点: ({fixed_origin[0]:.2f}, {fixed_origin[1]:.2f}, {fixed_origin[2]:.2f})")
-            print(f"与Fixed原点的偏差: ({predicted_new_origin[0]-fixed_origin[0]:.2f}, {predicted_new_origin[1]-fixed_origin[1]:.2f}, {predicted_new_origin[2]-fixed_origin[2]:.2f})")
+                self.logger.warning(
+                    f"Z轴有大幅偏移: {tz:.2f}mm (Moving Z轴从{moving_origin[2]:.2f}变为{moving_origin[2]+tz:.2f}，"
+                    f"Fixed Z轴是{fixed_origin[2]:.2f})，确保GUI的Z轴平移范围设置为±2000mm"
+                )
             
             # 配置变换参数
             rx, ry, rz = 0.0, 0.0, 0.0  # 默认不旋转
@@ -1139,35 +1279,63 @@ class ImageRigidMover(QObject):
             self.logger.error(error_msg, exc_info=True)
             return False, error_msg, {}
 
-    def compute_image_position(self, origin, direction, slice_number, spacing):
+    def _prepare_position_basis(self, origin, direction, spacing) -> Tuple[np.ndarray, np.ndarray]:
         """
-        计算DICOM切片的ImagePositionPatient值
+        预先计算切片位置的基向量，方向矩阵对所有切片相同，只需处理一次
         
         Args:
             origin: 图像原点坐标
-            direction: 图像方向余弦矩阵
-            slice_number: 切片索引
+            direction: 图像方向余弦矩阵（9个元素或3x3数组）
             spacing: 图像间距
             
         Returns:
-            List[float]: 切片的ImagePositionPatient值
+            Tuple[np.ndarray, np.ndarray]: (原点数组, 相邻切片沿Z方向的位移向量)
         """
-        # 将方向矩阵转换为3x3数组
-        direction_mat = np.array(direction).reshape(3, 3)
-        
-        # 计算Z方向的单位向量
         # 方向矩阵的第三列表示Z方向
-        z_unit = np.array([direction_mat[0, 2], direction_mat[1, 2], direction_mat[2, 2]])
+        direction_mat = np.asarray(direction, dtype=np.float64).reshape(3, 3)
+        z_unit = direction_mat[:, 2]
         
         # 归一化Z方向向量（确保是单位向量）
         z_norm = np.linalg.norm(z_unit)
         if z_norm > 0:
             z_unit = z_unit / z_norm
         
-        # 计算当前切片的偏移量
-        offset = slice_number * spacing[2] * z_unit
+        return np.asarray(origin, dtype=np.float64), spacing[2] * z_unit
+    
+    def _position_at(self, basis: Tuple[np.ndarray, np.ndarray], slice_number) -> np.ndarray:
+        """根据预先计算的基向量得到指定切片的位置"""
+        origin_arr, z_step = basis
+        return origin_arr + slice_number * z_step
+    
+    def compute_image_position(self, origin, direction, slice_number, spacing):
+        """
+        计算DICOM切片的ImagePositionPatient值
         
-        # 计算最终位置
-        position = np.array(origin) + offset
+        Args:
+            origin: 图像原点坐标
+            direction: 图像方向余弦矩阵
+            slice_number: 切片索引
+            spacing: 图像间距
+            
+        Returns:
+            List[float]: 切片的ImagePositionPatient值
+        """
+        basis = self._prepare_position_basis(origin, direction, spacing)
+        return self._position_at(basis, slice_number).tolist()
+
+    def compute_image_positions(self, origin, direction, num_slices, spacing) -> np.ndarray:
+        """
+        一次性计算所有DICOM切片的ImagePositionPatient值
         
-        return position.tolist()
\ No newline at end of file
+        Args:
+            origin: 图像原点坐标
+            direction: 图像方向余弦矩阵
+            num_slices: 切片数量
+            spacing: 图像间距
+            
+        Returns:
+            np.ndarray: 形状为(num_slices, 3)的切片位置数组
+        """
+        basis = self._prepare_position_basis(origin, direction, spacing)
+        # 原点加上各切片沿Z方向的偏移量
+        return self._position_at(basis, np.arange(num_slices, dtype=np.float64)[:, None])
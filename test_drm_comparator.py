@@ -1,7 +1,8 @@
 import unittest
 import os
-import SimpleITK as sitk
+import math
 import numpy as np
+import SimpleITK as sitk
 
 # Add the project root to the Python path to allow for absolute imports
 import sys
@@ -10,29 +11,87 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 from src.modules.drm_comparator.drm_comparator import DrmComparator
 
+try:
+    import torch
+except ImportError:
+    torch = None
+
 
 class TestDrmComparator(unittest.TestCase):
 
-    def setUp(self):
-        """Set up the test environment."""
-        self.comparator = DrmComparator()
-        self.test_data_dir = os.path.abspath(
+    @classmethod
+    def setUpClass(cls):
+        """Load the NIfTI, REG and DVF inputs once for the whole test case."""
+        cls.test_data_dir = os.path.abspath(
             os.path.join(os.path.dirname(__file__), "data", "drm_data")
         )
-        self.output_dir = os.path.abspath(
+        cls.output_dir = os.path.abspath(
             os.path.join(os.path.dirname(__file__), "output", "test_drm_comparator")
         )
+        # Under pytest-xdist (`pytest -n auto --dist loadfile`) give each worker
+        # its own output directory so parallel runs don't overwrite each other
+        xdist_worker = os.environ.get("PYTEST_XDIST_WORKER")
+        if xdist_worker:
+            cls.output_dir = os.path.join(cls.output_dir, xdist_worker)
 
         # Ensure output directory exists
-        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(cls.output_dir, exist_ok=True)
 
         # Define file paths
-        self.nifti_path = os.path.join(self.test_data_dir, "DRM.nii.gz")
-        self.reg_path = os.path.join(self.test_data_dir, "moving.dcm")
-        self.dvf_path = os.path.join(self.test_data_dir, "deformable.dcm")
+        cls.nifti_path = os.path.join(cls.test_data_dir, "DRM.nii.gz")
+        cls.reg_path = os.path.join(cls.test_data_dir, "moving.dcm")
+        cls.dvf_path = os.path.join(cls.test_data_dir, "deformable.dcm")
+
+        # The DVF decode dominates the suite's I/O, so read every input only once.
+        # This is also where SimpleITK's first-use IO/transform registration is
+        # paid, once per test case, so no separate pre-warming is needed.
+        loader = DrmComparator()
+        # Fail the whole case up front if an input is missing, rather than
+        # letting every test trip over a half-initialised comparator
+        if not loader.load_nifti(cls.nifti_path):
+            raise AssertionError(f"Failed to load NIfTI file: {cls.nifti_path}")
+        if not loader.load_rigid_transform(cls.reg_path):
+            raise AssertionError(f"Failed to load rigid transform: {cls.reg_path}")
+        if not loader.load_dvf(cls.dvf_path):
+            raise AssertionError(f"Failed to load DVF: {cls.dvf_path}")
+        cls._nifti_img = loader.nifti_image
+        cls._rigid_tf = loader.rigid_transform
+        cls._dvf_tf = loader.dvf_transform
+        cls._ref_for_dvf = loader.reference_image_for_dvf
+
+        # The deformable resample dominates the suite, so run the pipeline once
+        # and let the output-verification tests assert against the shared result
+        cls.target_image_path = os.path.join(cls.test_data_dir, "targetDRM.nii.gz")
+        cls._shared_comparator = cls._make_cached_comparator()
+        cls._shared_transform_result = (
+            cls._shared_comparator.apply_transformations()
+        )
+        cls._shared_target_result = (
+            cls._shared_comparator.resample_to_target_space(cls.target_image_path)
+        )
+
+    @classmethod
+    def _make_cached_comparator(cls):
+        """Build a DrmComparator backed by the cached inputs."""
+        comparator = DrmComparator()
+        # SimpleITK objects are reference counted, so these copies are cheap
+        comparator.nifti_image = sitk.Image(cls._nifti_img)
+        comparator.rigid_transform = sitk.AffineTransform(cls._rigid_tf)
+        comparator.dvf_transform = sitk.DisplacementFieldTransform(cls._dvf_tf)
+        comparator.reference_image_for_dvf = sitk.Image(cls._ref_for_dvf)
+        return comparator
+
+    @staticmethod
+    def _tuples_eq(a, b, rel_tol=1e-5, abs_tol=1e-8):
+        """Element-wise closeness of two short metadata tuples (no NumPy round-trip)."""
+        return len(a) == len(b) and all(
+            math.isclose(x, y, rel_tol=rel_tol, abs_tol=abs_tol) for x, y in zip(a, b)
+        )
 
     def test_01_file_loading(self):
         """Test the loading of NIfTI, DICOM REG, and DICOM DVF files."""
+        self.comparator = DrmComparator()
+
         # Test NIfTI loading
         self.assertTrue(
             self.comparator.load_nifti(self.nifti_path),
@@ -73,13 +132,9 @@ class TestDrmComparator(unittest.TestCase):
 
     def test_02_transformation_pipeline(self):
         """Test the full transformation pipeline from loading to result."""
-        # Step 1: Load all necessary files
-        self.comparator.load_nifti(self.nifti_path)
-        self.comparator.load_rigid_transform(self.reg_path)
-        self.comparator.load_dvf(self.dvf_path)
-
-        # Step 2: Apply transformations
-        success, message = self.comparator.apply_transformations()
+        # Step 1 & 2: Loading and transformation run once in setUpClass
+        self.comparator = self.__class__._shared_comparator
+        success, message = self.__class__._shared_transform_result
         self.assertTrue(
             success, f"Transformation pipeline failed with message: {message}"
         )
@@ -105,19 +160,23 @@ class TestDrmComparator(unittest.TestCase):
             "Final image size should match DVF grid size.",
         )
         self.assertTrue(
-            np.allclose(final_img.GetOrigin(), ref_img.GetOrigin()),
+            self._tuples_eq(final_img.GetOrigin(), ref_img.GetOrigin()),
             "Final image origin should match DVF grid origin.",
         )
         self.assertTrue(
-            np.allclose(final_img.GetSpacing(), ref_img.GetSpacing()),
+            self._tuples_eq(final_img.GetSpacing(), ref_img.GetSpacing()),
             "Final image spacing should match DVF grid spacing.",
         )
         self.assertTrue(
-            np.allclose(final_img.GetDirection(), ref_img.GetDirection()),
+            self._tuples_eq(final_img.GetDirection(), ref_img.GetDirection()),
             "Final image direction should match DVF grid direction.",
         )
 
-        # Step 5: Save the output files for manual inspection
+        # Step 5: Save the output files for manual inspection with
+        # verify_outputs.py, a local-only tool; no test reads them back, so the
+        # gzip-compressed writes are skipped on CI
+        if os.environ.get("CI"):
+            return
         rigid_path = os.path.join(self.output_dir, "test_rigid_output.nii.gz")
         final_path = os.path.join(self.output_dir, "test_final_output.nii.gz")
         self.assertTrue(
@@ -133,11 +192,8 @@ class TestDrmComparator(unittest.TestCase):
 
     def test_04_output_file_verification(self):
         """Verify that the output NIfTI file is created and has correct metadata."""
-        # Step 1: Run the full pipeline to generate the output file
-        self.comparator.load_nifti(self.nifti_path)
-        self.comparator.load_rigid_transform(self.reg_path)
-        self.comparator.load_dvf(self.dvf_path)
-        self.comparator.apply_transformations()
+        # Step 1: Reuse the pipeline result computed in setUpClass
+        self.comparator = self.__class__._shared_comparator
 
         # Step 2: Define the expected output path and save the final image
         final_output_path = os.path.join(
@@ -164,20 +220,23 @@ class TestDrmComparator(unittest.TestCase):
             "Saved image size should match DVF grid size.",
         )
         self.assertTrue(
-            np.allclose(saved_image.GetOrigin(), ref_image.GetOrigin()),
+            self._tuples_eq(saved_image.GetOrigin(), ref_image.GetOrigin()),
             "Saved image origin should match DVF grid origin.",
         )
         self.assertTrue(
-            np.allclose(saved_image.GetSpacing(), ref_image.GetSpacing()),
+            self._tuples_eq(saved_image.GetSpacing(), ref_image.GetSpacing()),
             "Saved image spacing should match DVF grid spacing.",
         )
         self.assertTrue(
-            np.allclose(saved_image.GetDirection(), ref_image.GetDirection()),
+            self._tuples_eq(saved_image.GetDirection(), ref_image.GetDirection()),
             "Saved image direction should match DVF grid direction.",
         )
 
     def test_03_error_handling(self):
         """Test error handling for incomplete inputs."""
+        # Build an uncached comparator so inputs are genuinely missing
+        self.comparator = DrmComparator()
+
         # Case 1: No files loaded
         success, message = self.comparator.apply_transformations()
         self.assertFalse(success, "Should fail when no files are loaded.")
@@ -197,18 +256,16 @@ class TestDrmComparator(unittest.TestCase):
 
     def test_05_three_step_registration_pipeline(self):
         """Test the complete three-step registration pipeline including target space resampling."""
-        # Load all required files
-        success = self.comparator.load_nifti(self.nifti_path)
-        self.assertTrue(success, "Failed to load NIfTI file")
-
-        success = self.comparator.load_rigid_transform(self.reg_path)
-        self.assertTrue(success, "Failed to load rigid transform")
-
-        success = self.comparator.load_dvf(self.dvf_path)
-        self.assertTrue(success, "Failed to load DVF")
+        # All required files are loaded once in setUpClass
+        self.comparator = self.__class__._shared_comparator
+        self.assertIsNotNone(self.comparator.nifti_image, "Failed to load NIfTI file")
+        self.assertIsNotNone(
+            self.comparator.rigid_transform, "Failed to load rigid transform"
+        )
+        self.assertIsNotNone(self.comparator.dvf_transform, "Failed to load DVF")
 
-        # Step 1 & 2: Apply rigid + DVF transformations
-        success, message = self.comparator.apply_transformations()
+        # Step 1 & 2: Rigid + DVF transformations were applied in setUpClass
+        success, message = self.__class__._shared_transform_result
         self.assertTrue(success, f"Failed to apply transformations: {message}")
 
         # Verify DVF space result exists
@@ -216,9 +273,8 @@ class TestDrmComparator(unittest.TestCase):
             self.comparator.final_transformed_image, "Final transformed image is None"
         )
 
-        # Step 3: Resample to target space
-        target_image_path = os.path.join("data", "drm_data", "targetDRM.nii.gz")
-        success, message = self.comparator.resample_to_target_space(target_image_path)
+        # Step 3: Resample to target space (also cached in setUpClass)
+        success, message = self.__class__._shared_target_result
         self.assertTrue(success, f"Failed to resample to target space: {message}")
 
         # Verify target space result exists
@@ -241,7 +297,8 @@ class TestDrmComparator(unittest.TestCase):
 
         try:
             target_output_image = sitk.ReadImage(target_output_file)
-            target_ref_image = sitk.ReadImage(target_image_path)
+            # The comparator already read the target image; reuse it
+            target_ref_image = self.comparator.target_reference_image
 
             # Verify dimensions match target space
             self.assertEqual(
@@ -270,5 +327,176 @@ class TestDrmComparator(unittest.TestCase):
             self.fail(f"Failed to verify target space output: {e}")
 
 
+
+class SyntheticRegistrationFixture:
+    """Small synthetic moving image, rotated rigid transform and smooth DVF (no data/ needed)."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.comparator = DrmComparator()
+
+        moving = sitk.GetImageFromArray(rng.random((20, 24, 28)).astype(np.float32))
+        moving.SetSpacing((2.0, 2.0, 3.0))
+        moving.SetOrigin((-20.0, -15.0, -10.0))
+        self.moving = moving
+        self.comparator.nifti_image = moving
+
+        rigid = sitk.Euler3DTransform()
+        rigid.SetCenter((5.0, 8.0, 20.0))
+        rigid.SetRotation(0.05, -0.03, 0.1)
+        rigid.SetTranslation((1.5, -2.0, 0.7))
+        self.comparator.rigid_transform = sitk.AffineTransform(
+            rigid.GetMatrix(), rigid.GetTranslation(), rigid.GetCenter()
+        )
+
+        # Smooth displacement on a coarser grid than the output
+        zz, yy, xx = np.meshgrid(
+            np.linspace(0, np.pi, 10), np.linspace(0, np.pi, 12),
+            np.linspace(0, np.pi, 14), indexing="ij",
+        )
+        displacement = np.stack(
+            (2.0 * np.sin(xx) * np.cos(yy), np.sin(yy) * np.sin(zz), 1.5 * np.cos(xx)),
+            axis=-1,
+        )
+        field = sitk.GetImageFromArray(displacement, isVector=True)
+        field.SetSpacing((4.0, 4.0, 6.0))
+        field.SetOrigin((-22.0, -17.0, -12.0))
+        self.comparator.dvf_transform = sitk.DisplacementFieldTransform(field)
+
+        reference = sitk.Image([30, 26, 18], sitk.sitkFloat32)
+        reference.SetSpacing((1.8, 2.1, 3.2))
+        reference.SetOrigin((-18.0, -14.0, -8.0))
+        self.reference = reference
+
+    def _composite_transform(self):
+        """Rigid + DVF composite as the comparator builds it (DVF applied first)."""
+        composite = sitk.CompositeTransform(3)
+        composite.AddTransform(self.comparator.rigid_transform)
+        composite.AddTransform(self.comparator.dvf_transform)
+        return composite
+
+    @staticmethod
+    def _resample_array(image, reference, transform):
+        """Linear resample of image onto reference's grid, returned as a NumPy array."""
+        return sitk.GetArrayFromImage(
+            sitk.Resample(image, reference, transform, sitk.sitkLinear, 0.0, image.GetPixelID())
+        )
+
+
+class TestCompositeResampleBackends(SyntheticRegistrationFixture, unittest.TestCase):
+    """Checks the optional torch resample against SimpleITK on synthetic inputs."""
+
+    def _make_resampler(self, interpolator, default_value=0.0):
+        resampler = sitk.ResampleImageFilter()
+        resampler.SetReferenceImage(self.reference)
+        resampler.SetInterpolator(interpolator)
+        resampler.SetTransform(self._composite_transform())
+        resampler.SetOutputPixelType(self.moving.GetPixelID())
+        resampler.SetDefaultPixelValue(default_value)
+        return resampler
+
+    def test_non_linear_interpolator_uses_simpleitk(self):
+        """The opt-in torch path must not replace a non-linear resample."""
+        self.comparator.use_gpu_resample = True
+        resampler = self._make_resampler(sitk.sitkNearestNeighbor)
+        self.assertFalse(self.comparator._use_gpu_resample(resampler))
+
+        result = self.comparator._resample_composite(resampler, self.moving, self.reference)
+        expected = resampler.Execute(self.moving)
+        np.testing.assert_array_equal(
+            sitk.GetArrayViewFromImage(result), sitk.GetArrayViewFromImage(expected)
+        )
+
+    def test_gpu_resample_is_opt_in(self):
+        """Without the flag the SimpleITK path is always taken."""
+        resampler = self._make_resampler(sitk.sitkLinear)
+        self.assertFalse(self.comparator._use_gpu_resample(resampler))
+
+    @unittest.skipIf(torch is None, "PyTorch is not installed")
+    def test_torch_matches_simpleitk(self):
+        """The torch resample agrees with SimpleITK, including default value and pixel type."""
+        resampler = self._make_resampler(sitk.sitkLinear, default_value=-1.0)
+        expected = sitk.GetArrayFromImage(resampler.Execute(self.moving))
+
+        result = self.comparator._resample_composite_torch(
+            self.moving, self.reference,
+            resampler.GetDefaultPixelValue(), resampler.GetOutputPixelType(),
+        )
+        self.assertEqual(result.GetPixelID(), resampler.GetOutputPixelType())
+        self.assertEqual(result.GetSize(), self.reference.GetSize())
+        actual = sitk.GetArrayFromImage(result)
+
+        # Part of the grid maps outside the moving image and gets the default value
+        self.assertTrue((expected == -1.0).any())
+        # float32 coordinates may flip the inside test for the odd voxel on the
+        # buffer edge, so require agreement on all but a tiny fraction
+        close = np.isclose(actual, expected, atol=1e-4)
+        self.assertGreater(close.mean(), 0.999)
+
+
+
+class TestResampleShortcuts(SyntheticRegistrationFixture, unittest.TestCase):
+    """The resample shortcuts must reproduce the plain rigid+DVF composite resample."""
+
+    def test_crop_matches_full_resample(self):
+        """Resampling the cropped moving image gives the same output as the full image."""
+        reference = sitk.Image([12, 10, 6], sitk.sitkFloat32)
+        reference.SetSpacing((1.5, 1.5, 2.0))
+        reference.SetOrigin((-4.0, -2.0, 8.0))
+
+        cropped = self.comparator._crop_moving_to_reference(reference)
+        # The reference covers only part of the moving image, so a real crop happens
+        self.assertTrue(
+            all(c < m for c, m in zip(cropped.GetSize(), self.moving.GetSize()))
+        )
+
+        expected = self._resample_array(self.moving, reference, self._composite_transform())
+        actual = self._resample_array(cropped, reference, self._composite_transform())
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_baked_field_matches_composite_on_dvf_grid(self):
+        """On the DVF grid the rigid-baked field reproduces the rigid+DVF composite."""
+        field = self.comparator.dvf_transform.GetDisplacementField()
+        dvf_grid = sitk.Image(field.GetSize(), sitk.sitkFloat32)
+        dvf_grid.CopyInformation(field)
+
+        expected = self._resample_array(self.moving, dvf_grid, self._composite_transform())
+        actual = self._resample_array(
+            self.moving, dvf_grid, self.comparator._bake_rigid_into_dvf()
+        )
+        # The rigid part moves the sample points, so the comparison is not trivial
+        dvf_only = self._resample_array(self.moving, dvf_grid, self.comparator.dvf_transform)
+        self.assertGreater(np.abs(expected - dvf_only).max(), 0.1)
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-5)
+
+    def test_low_res_field_close_to_full_field(self):
+        """The downsampled DVF displaces points like the full field, within 10% of the max displacement."""
+        field = self.comparator.dvf_transform.GetDisplacementField()
+        low_res = self.comparator._downsample_dvf(self.comparator.dvf_transform)
+        self.assertLess(low_res.GetDisplacementField().GetSize()[0], field.GetSize()[0])
+
+        # Query the output grid (off the DVF grid points), restricted to the span
+        # between the first and last DVF grid points: outside it ITK's half-voxel
+        # border differs between the two spacings
+        size = self.reference.GetSize()
+        points = [
+            self.reference.TransformIndexToPhysicalPoint((x, y, z))
+            for z in range(size[2]) for y in range(size[1]) for x in range(size[0])
+        ]
+        last_index = np.array(field.GetSize()) - 1
+        points = [
+            p for p in points
+            if np.all(np.abs(
+                np.array(field.TransformPhysicalPointToContinuousIndex(p)) - last_index / 2
+            ) <= last_index / 2)
+        ]
+        self.assertGreater(len(points), 1000)
+
+        full = np.array([self.comparator.dvf_transform.TransformPoint(p) for p in points])
+        low = np.array([low_res.TransformPoint(p) for p in points])
+        max_displacement = np.abs(full - np.array(points)).max()
+        self.assertLess(np.abs(full - low).max(), 0.1 * max_displacement)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
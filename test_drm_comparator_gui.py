@@ -7,8 +7,12 @@
 
 import os
 import sys
+
+# 无显示环境下运行(CI等)，必须在导入PyQt5之前设置
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTimer
+from PyQt5.QtTest import QTest
 
 # 添加src目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -18,7 +22,8 @@ def test_gui_integration():
     print("测试DRM比较器GUI集成")
     print("=" * 40)
     
-    app = QApplication(sys.argv)
+    # 同一进程(如pytest/xdist worker)内只能有一个QApplication，已存在时复用
+    app = QApplication.instance() or QApplication(sys.argv)
     
     try:
         # 导入主窗口
@@ -64,16 +69,12 @@ def test_gui_integration():
             print("❌ 未找到DRM比较器标签页")
             return False
         
-        # 显示窗口（短暂显示）
+        # 显示窗口并处理一次绘制事件，无需运行完整事件循环
         window.show()
-        
-        # 设置定时器自动关闭
-        timer = QTimer()
-        timer.timeout.connect(app.quit)
-        timer.start(3000)  # 3秒后关闭
-        
-        print("GUI窗口已显示，3秒后自动关闭...")
-        app.exec_()
+        QTest.qWait(50)
+        print("GUI窗口已显示并关闭")
+        window.close()
+        window.deleteLater()
         
         return True
         
@@ -88,7 +89,8 @@ def test_standalone_drm_gui():
     print("\n测试独立DRM比较器GUI")
     print("=" * 40)
     
-    app = QApplication(sys.argv)
+    # 同一进程(如pytest/xdist worker)内只能有一个QApplication，已存在时复用
+    app = QApplication.instance() or QApplication(sys.argv)
     
     try:
         # 直接导入DRM比较器GUI
@@ -125,16 +127,12 @@ def test_standalone_drm_gui():
         else:
             print("⚠️ 部分GUI组件缺失")
         
-        # 显示窗口
+        # 显示窗口并处理一次绘制事件，无需运行完整事件循环
         drm_gui.show()
-        
-        # 设置定时器自动关闭
-        timer = QTimer()
-        timer.timeout.connect(app.quit)
-        timer.start(2000)  # 2秒后关闭
-        
-        print("独立GUI窗口已显示，2秒后自动关闭...")
-        app.exec_()
+        QTest.qWait(50)
+        print("独立GUI窗口已显示并关闭")
+        drm_gui.close()
+        drm_gui.deleteLater()
         
         return all_components_exist
         
@@ -9,6 +9,7 @@ DRM转换器测试脚本
 import os
 import sys
 import logging
+import logging.handlers
 from pathlib import Path
 
 # 添加src目录到路径
@@ -17,15 +18,30 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 from modules.drm_converter import DRMConverter
 
 def setup_logging():
-    """设置日志"""
+    """
+    设置日志
+    转换时每个DICOM切片都会记一条日志，文件日志先缓存在内存中批量写入，
+    ERROR及以上立即写出；返回缓存handler，调用方结束时flush
+    """
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    
+    # delay=True: 第一次真正写入时才打开日志文件
+    file_handler = logging.FileHandler('drm_converter_test.log', encoding='utf-8', delay=True)
+    # basicConfig只给传入的handler设置格式，目标文件handler需要单独设置
+    file_handler.setFormatter(logging.Formatter(log_format))
+    memory_handler = logging.handlers.MemoryHandler(
+        capacity=1024, flushLevel=logging.ERROR, target=file_handler
+    )
+    
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
+        format=log_format,
         handlers=[
             logging.StreamHandler(),
-            logging.FileHandler('drm_converter_test.log', encoding='utf-8')
+            memory_handler
         ]
     )
+    return memory_handler
 
 def test_drm_converter():
     """测试DRM转换器"""
@@ -59,14 +75,26 @@ def test_drm_converter():
             logger.info(f"转换结果保存在: {output_folder_path}")
             
             # 检查输出文件
-            output_files = list(Path(output_folder_path).rglob("*.dcm"))
+            # os.walk + endswith 比 rglob 的逐个fnmatch匹配更快
+            output_files = [
+                os.path.join(root, name)
+                for root, _, names in os.walk(output_folder_path)
+                for name in names
+                if name.endswith(".dcm")
+            ]
             logger.info(f"生成的DICOM文件数量: {len(output_files)}")
             
             # 验证生成的DICOM文件是否为完整series
             if output_files:
                 import pydicom
                 first_file = str(output_files[0])
-                ds = pydicom.dcmread(first_file)
+                # UID/描述校验只需要这几个标签，其余元素不解析，也不读取像素数据
+                ds = pydicom.dcmread(
+                    first_file,
+                    stop_before_pixels=True,
+                    specific_tags=["SeriesInstanceUID", "StudyInstanceUID",
+                                   "SeriesDescription", "SeriesNumber"],
+                )
                 logger.info(f"Series UID: {ds.SeriesInstanceUID}")
                 logger.info(f"Study UID: {ds.StudyInstanceUID}")
                 logger.info(f"Series Description: {ds.SeriesDescription}")
@@ -75,7 +103,11 @@ def test_drm_converter():
                 # 检查几个文件确保它们有相同的Series UID
                 if len(output_files) > 1:
                     second_file = str(output_files[1])
-                    ds2 = pydicom.dcmread(second_file)
+                    ds2 = pydicom.dcmread(
+                        second_file,
+                        stop_before_pixels=True,
+                        specific_tags=["SeriesInstanceUID"],
+                    )
                     if ds.SeriesInstanceUID == ds2.SeriesInstanceUID:
                         logger.info("✅ 验证通过：文件属于同一个DICOM series")
                     else:
@@ -92,14 +124,18 @@ def test_drm_converter():
 
 def main():
     """主函数"""
-    setup_logging()
+    log_buffer = setup_logging()
     
     print("=" * 60)
     print("DRM转换器测试 - 改进版")
     print("现在生成的DICOM文件应该能被识别为完整的series")
     print("=" * 60)
     
-    success = test_drm_converter()
+    try:
+        success = test_drm_converter()
+    finally:
+        # 确保提示查看日志文件前，缓存的记录已写入
+        log_buffer.flush()
     
     if success:
         print("\n✅ 测试成功完成！")
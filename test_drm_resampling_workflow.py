@@ -7,12 +7,35 @@
 
 import os
 import sys
-import SimpleITK as sitk
 
 # 添加src目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from modules.correlation_analyzer import CorrelationAnalyzer
+from output_utils import list_output_files
+
+# SimpleITK、numpy和分析器(会带入matplotlib/scipy)在用到的函数内导入，
+# 只导入本模块(如测试收集)时不产生这些开销
+
+# 已读取的NIfTI图像，键为(路径, 修改时间)；两个测试读取的是同一批文件
+_NIFTI_CACHE = {}
+
+def read_nifti_cached(path):
+    """读取NIfTI图像，同一文件未修改时复用之前读取的结果"""
+    import SimpleITK as sitk
+    
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _NIFTI_CACHE:
+        _NIFTI_CACHE[key] = sitk.ReadImage(path)
+    return _NIFTI_CACHE[key]
+
+def load_nifti_cached(analyzer, path, is_first):
+    """通过缓存把NIfTI图像交给分析器，避免重复解压同一文件"""
+    try:
+        image = read_nifti_cached(path)
+    except (OSError, RuntimeError):
+        # 文件不存在或读取失败时交给分析器自己报告错误
+        image = None
+    return analyzer.load_nifti_file(path, is_first=is_first, image=image)
 
 def check_image_properties(image_path, name):
     """检查图像属性"""
@@ -21,18 +44,20 @@ def check_image_properties(image_path, name):
         return None
     
     try:
-        img = sitk.ReadImage(image_path)
+        import numpy as np
+        import SimpleITK as sitk
+        
+        img = read_nifti_cached(image_path)
         print(f"✅ {name}:")
         print(f"   路径: {image_path}")
         print(f"   尺寸: {img.GetSize()}")
         print(f"   间距: {img.GetSpacing()}")
         print(f"   原点: {img.GetOrigin()}")
         
-        # 获取数据范围
-        stats = sitk.StatisticsImageFilter()
-        stats.Execute(img)
-        print(f"   数值范围: [{stats.GetMinimum():.6f}, {stats.GetMaximum():.6f}]")
-        print(f"   均值: {stats.GetMean():.6f}")
+        # 获取数据范围 (零拷贝视图上的NumPy归约，均值用float64累加)
+        arr = sitk.GetArrayViewFromImage(img)
+        print(f"   数值范围: [{float(arr.min()):.6f}, {float(arr.max()):.6f}]")
+        print(f"   均值: {float(arr.mean(dtype=np.float64)):.6f}")
         print()
         return img
     except Exception as e:
@@ -82,6 +107,7 @@ def test_drm_resampling_workflow():
     print("-" * 30)
     
     # 创建相关性分析器
+    from modules.correlation_analyzer import CorrelationAnalyzer
     analyzer = CorrelationAnalyzer()
     
     # 设置自定义选项
@@ -94,11 +120,11 @@ def test_drm_resampling_workflow():
     
     # 使用匹配尺寸的文件进行分析
     print("加载目标DRM文件...")
-    success1, msg1 = analyzer.load_nifti_file(target_drm, is_first=True)
+    success1, msg1 = load_nifti_cached(analyzer, target_drm, is_first=True)
     print(f"结果: {msg1}")
     
     print("加载重采样后的DRM文件...")
-    success2, msg2 = analyzer.load_nifti_file(resampled_drm, is_first=False)
+    success2, msg2 = load_nifti_cached(analyzer, resampled_drm, is_first=False)
     print(f"结果: {msg2}")
     
     if success1 and success2:
@@ -123,9 +149,7 @@ def test_drm_resampling_workflow():
             
             # 检查输出文件
             if os.path.exists(output_dir):
-                files = os.listdir(output_dir)
-                png_files = [f for f in files if f.endswith('.png')]
-                csv_files = [f for f in files if f.endswith('.csv')]
+                png_files, csv_files = list_output_files(output_dir)
                 
                 if png_files:
                     print(f"✅ 生成散点图: {png_files[0]}")
@@ -151,6 +175,7 @@ def test_original_vs_target():
         return
     
     # 创建分析器
+    from modules.correlation_analyzer import CorrelationAnalyzer
     analyzer = CorrelationAnalyzer()
     analyzer.custom_options = {
         'chart_title': 'Original DRM vs Target DRM (Size Mismatch Demo)',
@@ -160,11 +185,11 @@ def test_original_vs_target():
     }
     
     print("加载原始DRM文件...")
-    success1, msg1 = analyzer.load_nifti_file(original_drm, is_first=True)
+    success1, msg1 = load_nifti_cached(analyzer, original_drm, is_first=True)
     print(f"结果: {msg1}")
     
     print("加载目标DRM文件...")
-    success2, msg2 = analyzer.load_nifti_file(target_drm, is_first=False)
+    success2, msg2 = load_nifti_cached(analyzer, target_drm, is_first=False)
     print(f"结果: {msg2}")
     
     if success1 and success2:
@@ -11,6 +11,7 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from modules.correlation_analyzer import CorrelationAnalyzer
+from output_utils import list_output_files
 
 def test_english_labels():
     """测试使用英文标签"""
@@ -55,9 +56,7 @@ def test_english_labels():
             
             # 检查输出文件
             if os.path.exists(output_dir):
-                files = os.listdir(output_dir)
-                png_files = [f for f in files if f.endswith('.png')]
-                csv_files = [f for f in files if f.endswith('.csv')]
+                png_files, csv_files = list_output_files(output_dir)
                 
                 if png_files:
                     print(f"✓ Generated plot: {png_files[0]}")
@@ -113,8 +112,7 @@ def test_mixed_languages():
             
             # 检查输出文件
             if os.path.exists(output_dir):
-                files = os.listdir(output_dir)
-                png_files = [f for f in files if f.endswith('.png')]
+                png_files, _ = list_output_files(output_dir)
                 
                 if png_files:
                     print(f"✓ Generated plot: {png_files[0]}")
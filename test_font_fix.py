@@ -7,13 +7,18 @@
 
 import os
 import sys
+import functools
+import matplotlib
+matplotlib.use("Agg")  # 只保存图片，不需要交互式后端
 import matplotlib.pyplot as plt
+import matplotlib.font_manager as fm
 import numpy as np
 
 # 添加src目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from modules.correlation_analyzer import CorrelationAnalyzer
+from output_utils import list_output_files
 
 def test_font_rendering():
     """测试字体渲染"""
@@ -30,10 +35,10 @@ def test_font_rendering():
     slope, intercept, r_value, p_value, std_err = linregress(x, y)
     
     # 创建图像
-    plt.figure(figsize=(10, 8))
+    fig = plt.figure(figsize=(10, 8))
     
-    # 绘制散点图
-    plt.scatter(x, y, alpha=0.6, s=30)
+    # 绘制散点图(点栅格化，文字仍为矢量，便于检查字体)
+    plt.scatter(x, y, alpha=0.6, s=30, rasterized=True)
     
     # 添加回归线
     line_x = np.array([np.min(x), np.max(x)])
@@ -61,8 +66,10 @@ def test_font_rendering():
     output_path = os.path.join(output_dir, "font_rendering_test.png")
     
     try:
-        plt.savefig(output_path, dpi=300, bbox_inches="tight")
-        plt.close()
+        # 用tight_layout代替bbox_inches="tight"，避免保存时额外的一次绘制
+        fig.tight_layout()
+        fig.savefig(output_path, dpi=150)
+        plt.close(fig)
         print(f"✓ 字体测试图像已保存: {output_path}")
         return True
     except Exception as e:
@@ -111,8 +118,7 @@ def test_nifti_analysis_with_font_fix():
             print(f"输出目录: {output_dir}")
             
             # 检查生成的文件
-            files = os.listdir(output_dir)
-            png_files = [f for f in files if f.endswith('.png')]
+            png_files, _ = list_output_files(output_dir)
             if png_files:
                 print(f"✓ 生成散点图: {png_files[0]}")
             return True
@@ -123,16 +129,19 @@ def test_nifti_analysis_with_font_fix():
         print("✗ 文件加载失败")
         return False
 
+@functools.lru_cache(maxsize=1)
+def _installed_fonts():
+    """已安装字体名集合(同一进程内只扫描一次字体列表)"""
+    return frozenset(f.name for f in fm.fontManager.ttflist)
+
 def check_available_fonts():
     """检查可用字体"""
     print("\n检查可用字体")
     print("=" * 40)
     
     try:
-        import matplotlib.font_manager as fm
-        
         # 获取系统字体
-        fonts = [f.name for f in fm.fontManager.ttflist]
+        fonts = _installed_fonts()
         
         # 检查推荐字体是否可用
         recommended_fonts = [
@@ -7,23 +7,25 @@
 
 import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTimer
 
 # 添加src目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from gui.main_window import MainWindow
-
 def test_gui_features():
     """测试GUI自定义功能"""
     print("测试GUI自定义功能")
     print("=" * 40)
     
-    app = QApplication(sys.argv)
+    # Qt相关导入放在函数内，仅收集测试时不会加载PyQt5和主窗口
+    from PyQt5.QtWidgets import QApplication
+    from gui.main_window import MainWindow
+    
+    app = QApplication.instance() or QApplication(sys.argv)
     
-    # 创建主窗口
+    # 创建并显示主窗口，处理一次挂起事件让布局完成，无需运行事件循环
     window = MainWindow()
+    window.show()
+    app.processEvents()
     
     # 检查NIfTI相关性分析标签页是否存在
     tab_count = window.tab_widget.count()
@@ -89,16 +91,8 @@ def test_gui_features():
     else:
         print("✗ 未找到NIfTI相关性分析标签页")
     
-    # 设置定时器自动关闭应用程序
-    timer = QTimer()
-    timer.timeout.connect(app.quit)
-    timer.start(2000)  # 2秒后自动关闭
-    
-    # 显示窗口
-    window.show()
-    
-    # 运行应用程序
-    app.exec_()
+    # 检查完成后直接关闭窗口
+    window.close()
     
     print("GUI测试完成")
 
@@ -0,0 +1,89 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.sequence import Sequence
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+# Add the project root to the Python path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from src.modules.image_regid_mover.image_rigid_mover import ImageRigidMover
+
+
+def make_rtss(contours):
+    """Build a minimal in-memory RTSS with one ROI holding the given ContourData lists."""
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.481.3"
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.preamble = b"\x00" * 128
+    ds.SOPClassUID = ds.file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+    ds.Modality = "RTSTRUCT"
+
+    roi_contour = Dataset()
+    roi_contour.ReferencedROINumber = 1
+    roi_contour.ContourSequence = Sequence()
+    for data in contours:
+        contour = Dataset()
+        contour.ContourGeometricType = "CLOSED_PLANAR"
+        contour.NumberOfContourPoints = len(data) // 3
+        contour.ContourData = data
+        roi_contour.ContourSequence.append(contour)
+    ds.ROIContourSequence = Sequence([roi_contour])
+    return ds
+
+
+class TestTransformRtss(unittest.TestCase):
+
+    def setUp(self):
+        self.contours = [
+            [0.0, 0.0, 0.0, 10.5, 0.0, 0.0, 10.5, 20.25, 0.0],
+            [-1.125, 2.5, 3.0, 4.0, -5.75, 3.0, 6.0, 7.0, 3.0],
+        ]
+        self.rtss = make_rtss([list(c) for c in self.contours])
+        self.mover = ImageRigidMover()
+
+    def test_01_source_contour_data_unchanged(self):
+        """Transforming must not modify the ContourData of the source RTSS."""
+        self.mover._transform_rtss(self.rtss, 10.1, -2.0, 3.5, 0, 0, 0)
+
+        source = self.rtss.ROIContourSequence[0].ContourSequence
+        for contour, expected in zip(source, self.contours):
+            self.assertEqual([float(v) for v in contour.ContourData], expected)
+
+    def test_02_transformed_copy_is_shifted(self):
+        """The returned dataset carries the translated contour points."""
+        shift = (10.1, -2.0, 3.5)
+        transformed = self.mover._transform_rtss(self.rtss, *shift, 0, 0, 0)
+
+        self.assertIsNot(transformed, self.rtss)
+        self.assertEqual(transformed.SOPInstanceUID, self.rtss.SOPInstanceUID)
+        moved = transformed.ROIContourSequence[0].ContourSequence
+        for contour, expected in zip(moved, self.contours):
+            for i, value in enumerate(contour.ContourData):
+                self.assertAlmostEqual(float(value), expected[i] + shift[i % 3], places=6)
+
+    def test_03_transformed_copy_can_be_saved(self):
+        """The transformed dataset keeps file_meta and preamble and can be written."""
+        transformed = self.mover._transform_rtss(self.rtss, 1.0, 2.0, 3.0, 0, 0, 0)
+        self.assertIsNot(transformed.file_meta, self.rtss.file_meta)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = os.path.join(tmp_dir, "RS.dcm")
+            transformed.save_as(output_file, enforce_file_format=False)
+            reread = pydicom.dcmread(output_file)
+
+        first = reread.ROIContourSequence[0].ContourSequence[0].ContourData
+        self.assertAlmostEqual(float(first[0]), 1.0)
+        self.assertAlmostEqual(float(first[1]), 2.0)
+        self.assertAlmostEqual(float(first[2]), 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -7,8 +7,9 @@
 
 import os
 import sys
+import math
 import logging
-import pandas as pd
+import logging.handlers
 from pathlib import Path
 
 # 添加src目录到路径
@@ -17,15 +18,30 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 from modules.correlation_analyzer import CorrelationAnalyzer
 
 def setup_logging():
-    """设置日志"""
+    """
+    设置日志
+    分析过程中每个掩码选项都会记录多条日志，文件日志先缓存在内存中批量写入，
+    ERROR及以上立即写出；返回缓存handler，调用方结束时flush
+    """
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    
+    # delay=True: 第一次真正写入时才打开日志文件
+    file_handler = logging.FileHandler('nifti_correlation_test.log', encoding='utf-8', delay=True)
+    # basicConfig只给传入的handler设置格式，目标文件handler需要单独设置
+    file_handler.setFormatter(logging.Formatter(log_format))
+    memory_handler = logging.handlers.MemoryHandler(
+        capacity=1024, flushLevel=logging.ERROR, target=file_handler
+    )
+    
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
+        format=log_format,
         handlers=[
             logging.StreamHandler(),
-            logging.FileHandler('nifti_correlation_test.log', encoding='utf-8')
+            memory_handler
         ]
     )
+    return memory_handler
 
 def test_nifti_correlation():
     """测试NIfTI文件相关性分析"""
@@ -51,7 +67,7 @@ def test_nifti_correlation():
     print(f"第二个NIfTI文件: {nifti2_path}")
     print(f"输出目录: {output_dir}")
     
-    # 创建相关性分析器
+    # 两个文件只加载一次，所有掩码选项共用同一个分析器及其派生数据缓存
     analyzer = CorrelationAnalyzer()
     
     # 加载第一个NIfTI文件
@@ -124,7 +140,7 @@ def test_nifti_correlation():
             print()
         
         # 找出最佳结果
-        best_result = max(results, key=lambda x: abs(x['pearson_r']) if not pd.isna(x['pearson_r']) else 0)
+        best_result = max(results, key=lambda x: 0.0 if math.isnan(x['pearson_r']) else abs(x['pearson_r']))
         print(f"最高相关性结果: {best_result['mask_option_name']}")
         print(f"Pearson r = {best_result['pearson_r']:.4f}")
         
@@ -134,8 +150,9 @@ def test_nifti_correlation():
         print("没有成功的分析结果")
         return False
 
-if __name__ == "__main__":
-    setup_logging()
+def main():
+    """主函数"""
+    log_buffer = setup_logging()
     
     try:
         success = test_nifti_correlation()
@@ -148,3 +165,9 @@ if __name__ == "__main__":
         print(f"\n✗ 测试过程中出现异常: {e}")
         logging.error(f"测试异常: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        # sys.exit退出前也会执行，确保缓存的记录已写入日志文件
+        log_buffer.flush()
+
+if __name__ == "__main__":
+    main()
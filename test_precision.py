@@ -4,10 +4,25 @@
 测试DRM转换后的数值精度
 """
 
-import pydicom
-import numpy as np
 import os
 
+def real_value_range(pixel_array, slope, intercept):
+    """
+    由原始像素范围直接得到真实数值范围
+    x*slope+intercept 对x单调(浮点舍入同样单调)，只需原始像素的min/max，
+    不必生成整幅图像大小的浮点临时数组
+    """
+    raw_min = pixel_array.min()
+    raw_max = pixel_array.max()
+    ends = (float(raw_min) * slope + intercept, float(raw_max) * slope + intercept)
+    return min(ends), max(ends), raw_min, raw_max
+
+def read_raw_pixels(ds):
+    """读取存储的原始像素值，跳过颜色空间转换(pydicom 3.x)"""
+    if hasattr(ds, 'pixel_array_options'):
+        ds.pixel_array_options(raw=True)
+    return ds.pixel_array
+
 def test_precision():
     """测试转换后的数值精度"""
     dicom_dir = "output/drm_converter_test/FAPI_DRM_DRM_DICOM"
@@ -16,14 +31,18 @@ def test_precision():
         print(f"目录不存在: {dicom_dir}")
         return
     
-    dcm_files = [f for f in os.listdir(dicom_dir) if f.endswith('.dcm')]
-    if not dcm_files:
+    # DirEntry.path已拼接好完整路径，循环中无需再os.path.join
+    with os.scandir(dicom_dir) as entries:
+        dcm_entries = [e for e in entries if e.is_file() and e.name.endswith('.dcm')]
+    if not dcm_entries:
         print("未找到DICOM文件")
         return
     
+    # pydicom只在真正读取文件时导入
+    import pydicom
+    
     # 读取第一个文件进行测试
-    first_file = os.path.join(dicom_dir, dcm_files[0])
-    ds = pydicom.dcmread(first_file)
+    ds = pydicom.dcmread(dcm_entries[0].path)
     
     print("=" * 60)
     print("DICOM数值精度测试")
@@ -38,14 +57,14 @@ def test_precision():
     print(f"RescaleType: {getattr(ds, 'RescaleType', 'N/A')}")
     
     # 获取原始像素数据
-    pixel_array = ds.pixel_array
+    pixel_array = read_raw_pixels(ds)
     print(f"像素数据类型: {pixel_array.dtype}")
     print(f"像素数据形状: {pixel_array.shape}")
-    print(f"原始像素值范围: {np.min(pixel_array)} 到 {np.max(pixel_array)}")
+    real_min, real_max, raw_min, raw_max = real_value_range(pixel_array, slope, intercept)
+    print(f"原始像素值范围: {raw_min} 到 {raw_max}")
     
     # 计算真实数值（应用rescale参数）
-    real_values = pixel_array * slope + intercept
-    print(f"真实数值范围: {np.min(real_values):.10f} 到 {np.max(real_values):.10f}")
+    print(f"真实数值范围: {real_min:.10f} 到 {real_max:.10f}")
     
     # 检查一些具体数值
     print("\n像素值示例（原始 -> 真实）:")
@@ -53,7 +72,7 @@ def test_precision():
     for i, j in sample_indices:
         if i < pixel_array.shape[0] and j < pixel_array.shape[1]:
             original = pixel_array[i, j]
-            real = original * slope + intercept
+            real = float(original) * slope + intercept
             print(f"  位置({i},{j}): {original} -> {real:.10f}")
     
     # 计算精度损失
@@ -62,18 +81,19 @@ def test_precision():
     print(f"对于0-10范围的数据，精度约为: {slope*10:.10f}")
     
     # 检查多个文件的一致性
-    if len(dcm_files) >= 3:
+    if len(dcm_entries) >= 3:
         print(f"\n检查多个文件的一致性:")
-        for i, filename in enumerate(dcm_files[:3]):
-            filepath = os.path.join(dicom_dir, filename)
-            test_ds = pydicom.dcmread(filepath)
+        for i, entry in enumerate(dcm_entries[:3]):
+            # 大元素(PixelData)延迟到真正访问时才读取
+            test_ds = pydicom.dcmread(entry.path, defer_size="1 KB")
             test_slope = float(test_ds.RescaleSlope) if hasattr(test_ds, 'RescaleSlope') else 1.0
             test_intercept = float(test_ds.RescaleIntercept) if hasattr(test_ds, 'RescaleIntercept') else 0.0
-            test_array = test_ds.pixel_array
-            test_real = test_array * test_slope + test_intercept
+            test_min, test_max, _, _ = real_value_range(
+                read_raw_pixels(test_ds), test_slope, test_intercept
+            )
             
             print(f"  文件 {i+1}: Slope={test_slope:.10f}, Intercept={test_intercept:.10f}")
-            print(f"    真实值范围: {np.min(test_real):.6f} 到 {np.max(test_real):.6f}")
+            print(f"    真实值范围: {test_min:.6f} 到 {test_max:.6f}")
 
 if __name__ == "__main__":
     test_precision() 
\ No newline at end of file
@@ -11,6 +11,7 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from modules.correlation_analyzer import CorrelationAnalyzer
+from output_utils import list_output_files
 
 def test_simple_analysis():
     """简单测试分析功能"""
@@ -55,8 +56,7 @@ def test_simple_analysis():
             
             # 检查输出文件
             if os.path.exists(output_dir):
-                files = os.listdir(output_dir)
-                png_files = [f for f in files if f.endswith('.png')]
+                png_files, _ = list_output_files(output_dir)
                 if png_files:
                     print(f"✓ 生成图像: {png_files[0]}")
                     print("请检查图像中是否还有字体问题")
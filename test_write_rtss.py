@@ -1,50 +1,135 @@
 import os
+import json
+import hashlib
+import functools
 import numpy as np
 import SimpleITK as sitk
-from platipy.imaging.dicom.io import write_rtstruct
-
-# 1. 读取 DICOM series
-dicom_dir = "output/forplatipy/img"  # 根据实际路径调整
-reader = sitk.ImageSeriesReader()
-series_IDs = reader.GetGDCMSeriesIDs(dicom_dir)
-if not series_IDs:
-    raise RuntimeError(f"No DICOM series found in {dicom_dir}")
-series_file_names = reader.GetGDCMSeriesFileNames(dicom_dir, series_IDs[0])
-reader.SetFileNames(series_file_names)
-ref_img = reader.Execute()  # SimpleITK.Image
-
-# 2. 生成球体掩膜（与参考影像空间一致）
-size = ref_img.GetSize()
-spacing = ref_img.GetSpacing()
-origin = ref_img.GetOrigin()
-direction = ref_img.GetDirection()
-
-# 球心为影像中心，半径为体积较小轴的1/4
-center = [origin[i] + spacing[i] * (size[i] / 2) for i in range(3)]
-radius = min([spacing[i] * size[i] for i in range(3)]) / 4
-
-# 生成球体掩膜
-mask_array = np.zeros((size[2], size[1], size[0]), dtype=np.uint8)  # z, y, x
-for z in range(size[2]):
-    for y in range(size[1]):
-        for x in range(size[0]):
-            pt = ref_img.TransformIndexToPhysicalPoint((x, y, z))
-            dist = np.sqrt(sum([(pt[i] - center[i]) ** 2 for i in range(3)]))
-            if dist <= radius:
-                mask_array[z, y, x] = 1
-
-sphere_mask = sitk.GetImageFromArray(mask_array)
-sphere_mask.CopyInformation(ref_img)
-
-# 3. 构建结构集字典
-structure_set = {"Sphere": sphere_mask}
-
-# 4. 写入 RTSS
-write_rtstruct(
-    dicom_dir,
-    structure_set,
-    filename="output_rtss.dcm",
-    description="Test RT Structure Set"
-)
-
-print("RTSS 已生成：output_rtss.dcm") 
\ No newline at end of file
+
+SERIES_INDEX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "dicomer", "series_index")
+
+def series_listing_key(dicom_dir):
+    """目录内容(文件名、大小、修改时间，只需stat)的哈希，内容不变时键不变"""
+    listing = sorted(
+        (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+        for entry in os.scandir(dicom_dir)
+        if entry.is_file()
+    )
+    return hashlib.sha1(json.dumps([os.path.abspath(dicom_dir), listing]).encode("utf-8")).hexdigest()
+
+def get_series_file_names(dicom_dir, key=None):
+    """
+    返回目录中第一个DICOM series的文件列表
+    GDCM扫描要解析目录内每个文件头；结果按目录内容键缓存到磁盘，
+    目录未变化时再次运行直接读取缓存(key为已算好的series_listing_key)
+    """
+    if key is None:
+        key = series_listing_key(dicom_dir)
+    cache_path = os.path.join(SERIES_INDEX_CACHE_DIR, f"{key}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    series_IDs = sitk.ImageSeriesReader.GetGDCMSeriesIDs(dicom_dir)
+    if not series_IDs:
+        raise RuntimeError(f"No DICOM series found in {dicom_dir}")
+    file_names = list(sitk.ImageSeriesReader.GetGDCMSeriesFileNames(dicom_dir, series_IDs[0]))
+
+    # 缓存只是加速，写入失败(如目录不可写)不影响结果
+    try:
+        os.makedirs(SERIES_INDEX_CACHE_DIR, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(file_names, f)
+    except OSError:
+        pass
+    return file_names
+
+@functools.lru_cache(maxsize=8)
+def _read_series(abs_dicom_dir, listing_key):
+    """
+    按(绝对路径, 目录内容键)缓存读取结果，同一进程内重复调用不再读取
+    目录修改时间在原地改写文件时不会变化，因此与磁盘缓存使用同一个内容键
+    """
+    reader = sitk.ImageSeriesReader()
+    reader.SetFileNames(get_series_file_names(abs_dicom_dir, listing_key))
+    return reader.Execute()
+
+def load_series(dicom_dir):
+    """读取目录中第一个DICOM series(返回的图像被缓存共享，调用方不应原地修改)"""
+    abs_dicom_dir = os.path.abspath(dicom_dir)
+    return _read_series(abs_dicom_dir, series_listing_key(abs_dicom_dir))
+
+def build_sphere_mask(ref_img, radius_factor=0.25):
+    """
+    生成与参考影像空间一致的球体掩膜(uint8图像)
+    球心为影像中心，半径为体积较小轴长度乘以radius_factor
+    """
+    # 几何参数一次性转为NumPy数组，后续计算都在数组上进行
+    size = np.array(ref_img.GetSize(), dtype=np.int64)
+    spacing = np.array(ref_img.GetSpacing(), dtype=np.float64)
+    origin = np.array(ref_img.GetOrigin(), dtype=np.float64)
+    direction = np.array(ref_img.GetDirection(), dtype=np.float64).reshape(3, 3)
+
+    # 物理坐标 = origin + M * index，M = direction * diag(spacing)，与TransformIndexToPhysicalPoint一致；
+    # 用ogrid广播逐轴计算，不再逐体素调用SimpleITK
+    M = direction * spacing[None, :]
+
+    # 球心取索引size/2处的物理点(考虑direction，斜位序列的球心也落在影像中心)
+    center = origin + M @ (size / 2)
+    radius = (spacing * size).min() * radius_factor
+
+    # 球体在索引空间中是椭球：球心索引 M^-1 (center - origin)，沿第j个索引轴的半宽为
+    # radius * ||M^-1 第j行||，只在这个包围盒内计算距离(任意direction都成立)
+    M_inv = np.linalg.inv(M)
+    center_index = M_inv @ (center - origin)
+    half_width = radius * np.linalg.norm(M_inv, axis=1)
+    lo = np.maximum(np.floor(center_index - half_width).astype(int), 0)
+    hi = np.minimum(np.ceil(center_index + half_width).astype(int) + 1, size)
+
+    # 每个物理轴的偏移 = (origin - center) + M[i,0]*ix + M[i,1]*iy + M[i,2]*iz：
+    # 乘法都在一维索引向量上完成，球心也并入一维项，三维上每轴只有两次加法和一次平方
+    iz, iy, ix = np.ogrid[lo[2]:hi[2], lo[1]:hi[1], lo[0]:hi[0]]  # z, y, x
+    offset = origin - center
+    dist2 = None
+    for i in range(3):
+        d = (offset[i] + M[i, 0] * ix) + M[i, 1] * iy + M[i, 2] * iz
+        d *= d
+        if dist2 is None:
+            dist2 = d
+        else:
+            dist2 += d
+
+    # 只需阈值判断，与半径平方比较，省去逐体素开方；
+    # bool与uint8同为1字节，直接按uint8解释，不再复制一遍
+    inside = np.zeros((size[2], size[1], size[0]), dtype=bool)  # z, y, x
+    if np.all(hi > lo):
+        inside[lo[2]:hi[2], lo[1]:hi[1], lo[0]:hi[0]] = dist2 <= radius * radius
+    mask_array = inside.view(np.uint8)
+
+    sphere_mask = sitk.GetImageFromArray(mask_array)
+    sphere_mask.CopyInformation(ref_img)
+    return sphere_mask
+
+def main():
+    # platipy只在真正写RTSS时需要，导入本模块复用上面的函数时不依赖它
+    from platipy.imaging.dicom.io import write_rtstruct
+
+    # 1. 读取 DICOM series
+    dicom_dir = "output/forplatipy/img"  # 根据实际路径调整
+    ref_img = load_series(dicom_dir)  # SimpleITK.Image
+
+    # 2. 生成球体掩膜（与参考影像空间一致）
+    # 3. 构建结构集字典
+    structure_set = {"Sphere": build_sphere_mask(ref_img)}
+
+    # 4. 写入 RTSS
+    write_rtstruct(
+        dicom_dir,
+        structure_set,
+        filename="output_rtss.dcm",
+        description="Test RT Structure Set"
+    )
+
+    print("RTSS 已生成：output_rtss.dcm")
+
+if __name__ == "__main__":
+    main()